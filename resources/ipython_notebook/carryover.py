@@ -0,0 +1,288 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    carryover
+    ~~~~~~~~~
+
+    This module measures order and carry-over effects in trial level
+    data, the limitation named in the report where the second
+    condition benefits from practice on the first.
+
+    Each participant did both conditions in one of two orders, a
+    two period crossover. Block means and practice slopes of every
+    participant come from segmented reductions (one `bincount` per
+    sum) over the trial records, so all participants are analysed
+    at once. Tests follow Grizzle's analysis of the AB/BA design.
+
+    Records are `synthetic.TRIAL_DTYPE` arrays or DataFrames with the
+    same fields.
+"""
+from __future__ import print_function
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from paired import paired_test_from_moments
+from synthetic import CONDITIONS
+
+# Arrays of shape (participants, 2), the second axis is the block
+# order, 0 for the block shown first.
+Blocks = namedtuple('Blocks', ['participants', 'first', 'count', 'mean',
+                               'slope'])
+
+SEQUENCES = ('Congruent first', 'Incongruent first')
+
+
+def block_statistics(records):
+    """Returns the mean time and practice slope of every block.
+
+    Parameters
+    ----------
+    records : ndarray/DataFrame
+        Trial records with participant, condition, order, trial
+        and rt fields, in any row order.
+
+    Returns
+    -------
+    blocks : Blocks
+        `participants` holds the sorted participant ids and
+        `first` the condition shown first (0 Congruent, 1
+        Incongruent). `count`, `mean` and `slope` are per block,
+        the slope is seconds per trial from a least squares line
+        of rt on the trial number.
+    """
+
+    participant = np.asarray(records['participant'])
+    order = np.asarray(records['order'], dtype=np.intp)
+    condition = np.asarray(records['condition'], dtype=float)
+    trial = np.asarray(records['trial'], dtype=float)
+    rt = np.asarray(records['rt'], dtype=float)
+
+    if (participant.size and participant.min() >= 0
+            and participant.max() < 2 * participant.size):
+        # Small non negative ids, relabel without sorting.
+        present = np.bincount(participant) > 0
+        participants = np.flatnonzero(present)
+        index = (np.cumsum(present) - 1)[participant]
+    else:
+        participants, index = np.unique(participant, return_inverse=True)
+    segment = index * 2 + order
+    size = participants.size * 2
+
+    def _sum(weights=None):
+        return np.bincount(segment, weights, minlength=size).reshape(-1, 2)
+
+    count = _sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = _sum(rt) / count
+        first = np.rint(_sum(condition)[:, 0] / count[:, 0])
+
+        # Least squares slope from centred segment sums.
+        trial_mean = _sum(trial) / count
+        centred = trial - trial_mean.ravel()[segment]
+        slope = (_sum(centred * rt) / _sum(centred * centred))
+
+    return Blocks(participants, first.astype(np.int8), count.astype(int),
+                  mean, slope)
+
+
+def by_condition(values, first):
+    """Reorders block values by condition.
+
+    Parameters
+    ----------
+    values : ndarray
+        Shape (participants, 2) by block order, e.g. `Blocks.mean`.
+    first : ndarray
+        Condition shown first per participant.
+
+    Returns
+    -------
+    values : ndarray
+        Shape (participants, 2), Congruent then Incongruent.
+    """
+
+    # The condition index is also the order it was shown in when
+    # Congruent was first, otherwise the columns swap.
+    block = np.stack([first, 1 - first], axis=1).astype(np.intp)
+    return np.take_along_axis(values, block, axis=1)
+
+
+def condition_frame(blocks, value='mean'):
+    """Returns one row per participant, one column per condition.
+
+    The frame has the layout of stroopdata.csv, so it plots with
+    `figures` and summarises with `tables` and `descriptive`.
+
+    Parameters
+    ----------
+    blocks : Blocks
+    value : string
+        'mean' or 'slope'.
+
+    Returns
+    -------
+    data : DataFrame
+        Indexed by participant.
+    """
+
+    if value not in ('mean', 'slope'):
+        raise ValueError(
+                         "value must be 'mean' or 'slope', not {0!r}"
+                         .format(value)
+                         )
+    values = by_condition(getattr(blocks, value), blocks.first)
+    return pd.DataFrame(values, index=pd.Index(blocks.participants,
+                                               name='participant'),
+                        columns=list(CONDITIONS))
+
+
+def _group_moments(x, group):
+    """Returns the count, mean and variance (n - 1) of x per group
+    (0 and 1) as arrays of shape (2, columns)."""
+
+    x = np.asarray(x, dtype=float).reshape(len(group), -1)
+    present = ~np.isnan(x)
+    x = np.where(present, x, 0)
+    n = np.stack([present[group == g].sum(axis=0) for g in (0, 1)])
+    total = np.stack([x[group == g].sum(axis=0) for g in (0, 1)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        squares = np.stack([(np.where(present, x - mean[g], 0)[group == g]
+                             ** 2).sum(axis=0) for g in (0, 1)])
+        var = squares / (n - 1)
+    return n, mean, var
+
+
+def crossover(blocks, confidence=0.95):
+    """Returns the condition, order and carry-over tests.
+
+    Each effect is a difference between the two sequences,
+    tested with a pooled two sample t test.
+
+    condition
+        Incongruent - Congruent, corrected for order. Half the
+        first minus second block difference, Incongruent first
+        minus Congruent first.
+    order
+        First - second block, positive when participants get
+        faster with practice. Half the block differences, summed
+        over the sequences.
+    carryover
+        Participant totals, Incongruent first minus Congruent
+        first. Non zero when practice on one condition helps the
+        other by a different amount than the reverse.
+
+    Parameters
+    ----------
+    blocks : Blocks
+    confidence : float
+        Level of the two sided confidence intervals.
+
+    Returns
+    -------
+    results : DataFrame
+        One row per effect with estimate, se, t, d_free, p,
+        ci_lower, ci_upper and the participants per sequence.
+    """
+
+    period = (blocks.mean[:, 0] - blocks.mean[:, 1]) / 2.
+    total = blocks.mean[:, 0] + blocks.mean[:, 1]
+    n, mean, var = _group_moments(np.column_stack([period, total]),
+                                  blocks.first)
+
+    d_free = n.sum(axis=0) - 2
+    pooled = ((n - 1) * var).sum(axis=0) / d_free
+    se = np.sqrt(pooled * (1. / n).sum(axis=0))
+
+    # Columns: condition and order from the period differences,
+    # carry-over from the totals.
+    estimate = np.array([mean[1, 0] - mean[0, 0], mean[1, 0] + mean[0, 0],
+                         mean[1, 1] - mean[0, 1]])
+    se = se[[0, 0, 1]]
+    d_free = d_free[[0, 0, 1]]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = estimate / se
+    p = 2 * stats.t.sf(np.abs(t), d_free)
+    m_error = stats.t.ppf((1 + confidence) / 2., d_free) * se
+
+    return pd.DataFrame({
+                         'estimate': estimate,
+                         'se': se,
+                         't': t,
+                         'd_free': d_free,
+                         'p': p,
+                         'ci_lower': estimate - m_error,
+                         'ci_upper': estimate + m_error,
+                         'n_congruent_first': n[0, [0, 0, 1]],
+                         'n_incongruent_first': n[1, [0, 0, 1]]
+                         }, index=pd.Index(['condition', 'order',
+                                            'carryover'], name='effect'))
+
+
+def sequence_paired_tests(blocks, confidence=0.95):
+    """Returns paired tests of Incongruent - Congruent per
+    counterbalancing sequence and over all participants.
+
+    Returns
+    -------
+    results : DataFrame
+        Indexed by sequence, the last row 'All', with the fields
+        of `paired.PairedTest`.
+    """
+
+    values = by_condition(blocks.mean, blocks.first)
+    difference = values[:, 1] - values[:, 0]
+    n, mean, var = _group_moments(difference, blocks.first)
+
+    all_n = n.sum()
+    all_mean = np.nanmean(difference)
+    all_sd = np.nanstd(difference, ddof=1)
+
+    test = paired_test_from_moments(
+                                    np.append(n[:, 0], all_n),
+                                    np.append(mean[:, 0], all_mean),
+                                    np.append(np.sqrt(var[:, 0]), all_sd),
+                                    confidence=confidence
+                                    )
+    return pd.DataFrame(test._asdict(),
+                        index=pd.Index(list(SEQUENCES) + ['All'],
+                                       name='sequence'))
+
+
+def practice_tests(blocks, confidence=0.95):
+    """Returns one sample t tests of the practice slopes.
+
+    A negative slope means trials get faster within a block.
+
+    Returns
+    -------
+    results : DataFrame
+        Indexed by (order, condition): the first and second
+        block of each condition, with the fields of
+        `paired.PairedTest` against a slope of 0.
+    """
+
+    slope = by_condition(blocks.slope, blocks.first)
+    # Condition c was shown second when first != c.
+    second = np.stack([blocks.first != 0, blocks.first != 1], axis=1)
+
+    rows = []
+    for position, mask in (('first', ~second), ('second', second)):
+        x = np.where(mask, slope, np.nan)
+        rows.append((position, np.sum(~np.isnan(x), axis=0),
+                     np.nanmean(x, axis=0), np.nanstd(x, axis=0, ddof=1)))
+
+    with np.errstate(invalid='ignore'):
+        test = paired_test_from_moments(
+                                        np.concatenate([r[1] for r in rows]),
+                                        np.concatenate([r[2] for r in rows]),
+                                        np.concatenate([r[3] for r in rows]),
+                                        confidence=confidence
+                                        )
+    index = pd.MultiIndex.from_product([[r[0] for r in rows],
+                                        list(CONDITIONS)],
+                                       names=['order', 'condition'])
+    return pd.DataFrame(test._asdict(), index=index)
@@ -0,0 +1,226 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    comparisons
+    ~~~~~~~~~~~
+
+    This module compares every pair of within subject conditions
+    with paired t tests in one vectorized pass, and corrects the
+    p values for multiple testing (Holm, Benjamini-Hochberg or
+    Bonferroni).
+"""
+from __future__ import print_function
+import numpy as np
+import pandas as pd
+
+from paired import effect_size_intervals, paired_test_from_moments
+
+# Columns of `pairwise_tests` that change sign when a and b swap.
+SIGNED = ('t', 'mean_difference', 'cohen_d', 'd_av')
+
+# Interval bounds of `pairwise_tests`, swapping a and b negates
+# them and exchanges lower and upper.
+SWAPPED_BOUNDS = {
+                  'ci_lower': 'ci_upper',
+                  'ci_upper': 'ci_lower',
+                  'cohen_d_lower': 'cohen_d_upper',
+                  'cohen_d_upper': 'cohen_d_lower',
+                  'd_av_lower': 'd_av_upper',
+                  'd_av_upper': 'd_av_lower'
+                  }
+
+
+def adjust_p_values(p, method='holm'):
+    """Returns p values adjusted for multiple testing.
+
+    Parameters
+    ----------
+    p : array_like
+        Unadjusted p values of a family of tests.
+    method : string/None
+        'holm' controls the family wise error rate,
+        'bh' (Benjamini-Hochberg) the false discovery rate,
+        'bonferroni' the family wise error rate conservatively,
+        None leaves the values unchanged.
+
+    Returns
+    -------
+    adjusted : ndarray
+        Adjusted p values in the input order, at most 1. Missing
+        p values (degenerate tests) stay missing and do not count
+        towards the size of the family.
+    """
+
+    p = np.asarray(p, dtype=float)
+    if method is None:
+        return p.copy()
+
+    result = np.full(p.shape, np.nan)
+    present = np.flatnonzero(~np.isnan(p))
+    p_present = p[present]
+    m = p_present.size
+
+    if method == 'bonferroni':
+        result[present] = np.minimum(p_present * m, 1)
+        return result
+
+    order = np.argsort(p_present, kind='mergesort')
+    p_sorted = p_present[order]
+    rank = np.arange(1, m + 1)
+
+    if method == 'holm':
+        adjusted = np.maximum.accumulate((m - rank + 1) * p_sorted)
+    elif method == 'bh':
+        adjusted = np.minimum.accumulate(
+                                         (p_sorted * m / rank)[::-1]
+                                         )[::-1]
+    else:
+        raise ValueError(
+                         "method must be 'holm', 'bh', 'bonferroni' or "
+                         "None, not {0!r}".format(method)
+                         )
+
+    result[present[order]] = np.minimum(adjusted, 1)
+    return result
+
+
+def _pair_moments(x, first, second):
+    """Returns n, mean and sd of x[:, first] - x[:, second], and
+    the sd of each condition over the same rows.
+
+    Complete data uses the covariance matrix, computed once with
+    a single matrix product. Missing values fall back to the
+    explicit matrix of differences with pairwise deletion.
+    """
+
+    if not np.isnan(x).any():
+        n = x.shape[0]
+        mean = x.mean(axis=0)
+        centred = x - mean
+        cov = centred.T.dot(centred) / (n - 1)
+        var = (cov[first, first] + cov[second, second]
+               - 2 * cov[first, second])
+        sd = np.sqrt(np.diag(cov))
+        return (np.repeat(float(n), first.size),
+                mean[first] - mean[second],
+                np.sqrt(np.maximum(var, 0)),
+                sd[first], sd[second])
+
+    diff = x[:, first] - x[:, second]
+    present = ~np.isnan(diff)
+    n = present.sum(axis=0).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(present, diff, 0).sum(axis=0) / n
+        deviation = np.where(present, diff - mean, 0)
+        sd = np.sqrt((deviation ** 2).sum(axis=0) / (n - 1))
+        sd_first, sd_second = [_masked_sd(x[:, index], present, n)
+                               for index in (first, second)]
+    return n, mean, sd, sd_first, sd_second
+
+
+def _masked_sd(x, present, n):
+    """Returns the sd of each column over its `present` rows."""
+
+    mean = np.where(present, x, 0).sum(axis=0) / n
+    deviation = np.where(present, x - mean, 0)
+    return np.sqrt((deviation ** 2).sum(axis=0) / (n - 1))
+
+
+def pairwise_tests(data, conditions=None, correction='holm', alpha=0.05,
+                   confidence=0.95):
+    """Returns paired t tests for every pair of conditions.
+
+    Parameters
+    ----------
+    data : DataFrame
+        One row per participant, one column per condition.
+    conditions : None/list
+        Columns to compare, None uses all columns.
+    correction : string/None
+        Multiple testing correction, see `adjust_p_values`.
+    alpha : float
+        Significance level for the `reject` column.
+    confidence : float
+        Level of the confidence intervals around each mean
+        difference and effect size.
+
+    Returns
+    -------
+    results : DataFrame
+        One row per pair (a, b) of a - b with n, mean_difference,
+        sd_difference, t, p, p_adjusted, reject, ci_lower, ci_upper,
+        cohen_d (d_z) and d_av with their confidence bounds, see
+        `paired.effect_size_intervals`.
+    """
+
+    if conditions is None:
+        conditions = list(data.columns)
+    x = data[list(conditions)].to_numpy(dtype=float)
+
+    first, second = np.triu_indices(len(conditions), k=1)
+    n, mean, sd, sd_a, sd_b = _pair_moments(x, first, second)
+    test = paired_test_from_moments(n, mean, sd, confidence=confidence)
+    p_adjusted = adjust_p_values(test.p, correction)
+    effects = effect_size_intervals(test, sd_a, sd_b, confidence)
+
+    names = np.asarray(conditions, dtype=object)
+    return pd.DataFrame({
+                         'a': names[first],
+                         'b': names[second],
+                         'n': n.astype(int),
+                         'mean_difference': mean,
+                         'sd_difference': sd,
+                         't': test.t,
+                         'p': test.p,
+                         'p_adjusted': p_adjusted,
+                         'reject': p_adjusted < alpha,
+                         'ci_lower': test.ci_lower,
+                         'ci_upper': test.ci_upper,
+                         'cohen_d': test.cohen_d,
+                         'cohen_d_lower': effects.d_z_lower,
+                         'cohen_d_upper': effects.d_z_upper,
+                         'd_av': effects.d_av,
+                         'd_av_lower': effects.d_av_lower,
+                         'd_av_upper': effects.d_av_upper
+                         })
+
+
+def comparison_matrix(results, value='t'):
+    """Returns one column of `pairwise_tests` as a square matrix.
+
+    Rows are condition a and columns condition b. Signed values
+    (`SIGNED`) change sign below the diagonal, so do interval
+    bounds (`SWAPPED_BOUNDS`), which also swap lower and upper.
+    Others are mirrored.
+
+    Parameters
+    ----------
+    results : DataFrame
+        Output of `pairwise_tests`.
+    value : string
+        Column of `results` to arrange.
+
+    Returns
+    -------
+    matrix : DataFrame
+    """
+
+    names = list(pd.unique(np.r_[results['a'].values,
+                                 results['b'].values]))
+    index = dict((name, i) for i, name in enumerate(names))
+    rows = results['a'].map(index).values
+    cols = results['b'].map(index).values
+    values = results[value].to_numpy(dtype=float)
+
+    matrix = np.full((len(names), len(names)), np.nan)
+    matrix[rows, cols] = values
+    if value in SWAPPED_BOUNDS:
+        # The (b, a) lower bound is minus the (a, b) upper bound.
+        other = SWAPPED_BOUNDS[value]
+        matrix[cols, rows] = -results[other].to_numpy(dtype=float)
+    elif value in SIGNED:
+        matrix[cols, rows] = -values
+    else:
+        matrix[cols, rows] = values
+
+    return pd.DataFrame(matrix, index=names, columns=names)
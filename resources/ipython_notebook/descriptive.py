@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    descriptive
+    ~~~~~~~~~~~
+
+    This module computes the descriptive statistics shown by
+    `tables`, without importing matplotlib or seaborn.
+
+    Statistics are grouped in the same four sections as the plotted
+    tables (Top, Central Tendency, Dispersion, Distribution) and can
+    be rendered as text, HTML, LaTeX or JSON by `renderers`.
+"""
+from __future__ import print_function
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+import robust
+from precision import moments, working_dtype
+
+# One row of a section, `values` holds one number per column.
+Statistic = namedtuple('Statistic', ['key', 'label', 'tex', 'values'])
+
+# A titled group of statistics.
+Section = namedtuple('Section', ['title', 'statistics'])
+
+# All sections for a set of columns.
+Summary = namedtuple('Summary', ['columns', 'sections'])
+
+# Section titles with the key, plain label and tex label of
+# every statistic, in the order the tables show them.
+LAYOUT = (
+          ('Top', (
+                   ('count', 'samples', r'samples, $n$'),
+                   )),
+          ('Central Tendency', (
+                                ('mean', 'mean', r'mean, $\bar x$'),
+                                ('median', 'median', 'median'),
+                                )),
+          ('Dispersion', (
+                          ('std', 'stan. dev.', r'stan. dev. $s$'),
+                          ('iqr', 'IQR', r'$IQR$'),
+                          ('mad', 'mean abs. dev.', 'mean abs. dev.'),
+                          ('var', 'variance', r'variance, $s^2$'),
+                          ('range', 'range', 'range'),
+                          )),
+          ('Distribution', (
+                            ('max', 'maximum', 'maximum'),
+                            ('q95', 'Q(0.95)', r'$Q(0.95)$'),
+                            ('q90', 'Q(0.90)', r'$Q(0.90)$'),
+                            ('q75', 'Q(0.75)', r'$Q(0.75)$'),
+                            ('q50', 'Q(0.50)', r'$Q(0.50)$'),
+                            ('q25', 'Q(0.25)', r'$Q(0.25)$'),
+                            ('q10', 'Q(0.10)', r'$Q(0.10)$'),
+                            ('q05', 'Q(0.05)', r'$Q(0.05)$'),
+                            ('min', 'minimum', 'minimum'),
+                            )),
+          )
+
+# Probabilities of the quantile keys.
+QUANTILES = (
+             ('q95', 0.95), ('q90', 0.9), ('q75', 0.75),
+             ('q50', 0.5), ('q25', 0.25), ('q10', 0.1),
+             ('q05', 0.05)
+             )
+
+
+def statistics(data, dtype='float64'):
+    """Returns every statistic in `LAYOUT` for each column.
+
+    Parameters
+    ----------
+    data : DataFrame object
+        Pandas DataFrame containing columns to be used
+        for statistics.
+    dtype : string
+        'float64', or 'float32' to compute in reduced precision
+        within `precision.FLOAT32_TOLERANCES`.
+
+    Returns
+    -------
+    values : dict
+        Maps statistic keys to arrays with one value per column.
+        'count' is the number of non missing values, as in
+        `sharded` and `rolling`.
+    """
+
+    data = pd.DataFrame(data)
+    x = data.to_numpy(dtype=working_dtype(dtype))
+
+    # One selection pass for every quantile the tables show.
+    probs = [0.25, 0.5, 0.75] + [prob for key, prob in QUANTILES]
+    q = robust.quantiles(x, probs)
+    n, mean, var = moments(x)
+    # Empty and all missing columns give NaN, as quantiles do.
+    v_max = np.where(n > 0, np.nanmax(x, axis=0, initial=-np.inf), np.nan)
+    v_min = np.where(n > 0, np.nanmin(x, axis=0, initial=np.inf), np.nan)
+
+    values = {
+              'count': n,
+              'mean': mean,
+              'median': q[1],
+              'std': np.sqrt(var),
+              'iqr': q[2] - q[0],
+              'mad': robust.mean_abs_deviation(x),
+              'var': var,
+              'range': v_max - v_min,
+              'max': v_max,
+              'min': v_min,
+              }
+    for i, (key, prob) in enumerate(QUANTILES):
+        values[key] = q[3 + i]
+
+    return values
+
+
+def build_summary(columns, values):
+    """Arranges computed statistics into sections.
+
+    Parameters
+    ----------
+    columns : list
+        Names of the columns, one per value.
+    values : dict
+        Maps every key in `LAYOUT` to an array of values.
+
+    Returns
+    -------
+    summary : Summary
+    """
+
+    sections = []
+    for title, rows in LAYOUT:
+        stats = [Statistic(key, label, tex, np.asarray(values[key]))
+                 for key, label, tex in rows]
+        sections.append(Section(title, stats))
+
+    return Summary(list(columns), sections)
+
+
+def describe(data, column_name=None, dtype='float64'):
+    """Returns the descriptive statistics of a DataFrame.
+
+    Parameters
+    ----------
+    data : DataFrame
+        pandas DataFrame containing data corresponding to column
+        names. Only select columns to be displayed.
+    column_name : None/list
+        List of strings for column names, None uses the
+        DataFrame column headers.
+    dtype : string
+        'float64' or 'float32', see `statistics`.
+
+    Returns
+    -------
+    summary : Summary
+        Columns and the Top, Central Tendency, Dispersion
+        and Distribution sections.
+    """
+
+    data = pd.DataFrame(data)
+    if column_name is None:
+        column_name = [str(c) for c in data.columns]
+
+    return build_summary(column_name, statistics(data, dtype))
+
+
+def section(summary, title):
+    """Returns one section of a summary by title."""
+
+    for sec in summary.sections:
+        if sec.title == title:
+            return sec
+    raise KeyError(title)
@@ -0,0 +1,418 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    exgauss
+    ~~~~~~~
+
+    This module fits reaction time distributions, ex-Gaussian and
+    shifted lognormal, to every participant and condition at once.
+
+    Groups are padded into one 2-D array and all their likelihoods
+    are maximised together by a damped Newton method that steps
+    every group in lockstep, using analytic gradients. Large inputs
+    are split into batches that can run in a process pool. Fits
+    start from the method of moments or from earlier fits (warm
+    starts).
+
+    Fitted parameters convert to frozen scipy distributions, usable
+    as the `distribution` argument of `figures.qq_plot`.
+"""
+from __future__ import print_function
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import special, stats
+
+_LOG_SQRT_2PI = 0.5 * np.log(2 * np.pi)
+
+EXGAUSS_PARAMS = ('mu', 'sigma', 'tau')
+LOGNORMAL_PARAMS = ('shift', 'm', 's')
+
+
+def exgauss_distribution(mu, sigma, tau):
+    """Returns a frozen scipy ex-Gaussian distribution.
+
+    Parameters
+    ----------
+    mu, sigma : float
+        Mean and standard deviation of the normal component.
+    tau : float
+        Mean of the exponential component.
+    """
+
+    return stats.exponnorm(tau / sigma, loc=mu, scale=sigma)
+
+
+def shifted_lognormal_distribution(shift, m, s):
+    """Returns a frozen scipy shifted lognormal distribution.
+
+    Parameters
+    ----------
+    shift : float
+        Smallest possible value.
+    m, s : float
+        Mean and standard deviation of log(x - shift).
+    """
+
+    return stats.lognorm(s, loc=shift, scale=np.exp(m))
+
+
+def distribution(fit, model='exgauss'):
+    """Returns the frozen distribution of one row of a fit.
+
+    Parameters
+    ----------
+    fit : Series/dict
+        One row of `fit_exgauss` or `fit_shifted_lognormal`.
+    model : string
+        'exgauss' or 'lognormal'.
+    """
+
+    if model == 'exgauss':
+        return exgauss_distribution(fit['mu'], fit['sigma'], fit['tau'])
+    elif model == 'lognormal':
+        return shifted_lognormal_distribution(fit['shift'], fit['m'],
+                                              fit['s'])
+    raise ValueError(
+                     "model must be 'exgauss' or 'lognormal', not {0!r}"
+                     .format(model)
+                     )
+
+
+def _padded_groups(data, value, by):
+    """Returns group keys and values padded into a 2-D array.
+
+    Parameters
+    ----------
+    data : DataFrame/structured ndarray
+        Long format data, one row per observation.
+    value : string
+        Column of observations.
+    by : list
+        Columns identifying a group.
+
+    Returns
+    -------
+    keys : MultiIndex/Index
+    x : ndarray
+        Array (groups, largest group), padding is 0.
+    mask : ndarray
+        True for real observations.
+    """
+
+    data = pd.DataFrame(data)
+    data = data[~np.isnan(data[value].to_numpy(dtype=float))]
+    grouped = data.groupby(list(by), sort=True)
+
+    code = grouped.ngroup().to_numpy()
+    position = grouped.cumcount().to_numpy()
+    n = np.bincount(code)
+
+    x = np.zeros((n.size, n.max() if n.size else 0))
+    mask = np.zeros(x.shape, dtype=bool)
+    x[code, position] = data[value].to_numpy(dtype=float)
+    mask[code, position] = True
+
+    keys = grouped.size().index
+    return keys, x, mask
+
+
+def _moments(x, mask):
+    """Returns mean, variance and skewness of every group."""
+
+    n = mask.sum(axis=1)
+    mean = np.where(mask, x, 0).sum(axis=1) / n
+    deviation = np.where(mask, x - mean[:, np.newaxis], 0)
+    var = (deviation ** 2).sum(axis=1) / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        skew = (deviation ** 3).sum(axis=1) / n / var ** 1.5
+    return mean, var, np.nan_to_num(skew)
+
+
+def _exgauss_start(x, mask):
+    """Method of moments starting values, (groups, 3) in the
+    optimised parameterisation mu, log sigma, log tau."""
+
+    mean, var, skew = _moments(x, mask)
+    sd = np.sqrt(np.maximum(var, 1e-12))
+    tau = sd * (np.clip(skew, 0.1, 1.9) / 2.) ** (1 / 3.)
+    sigma = np.sqrt(np.maximum(var - tau ** 2, 1e-4 * var + 1e-12))
+    return np.column_stack([mean - tau, np.log(sigma), np.log(tau)])
+
+
+def _exgauss_objective(theta, x, mask, n):
+    """Mean negative log likelihood of every group, and gradients,
+    for parameters mu, log sigma, log tau."""
+
+    theta = theta.reshape(-1, 3)
+    mu = theta[:, 0:1]
+    sigma = np.exp(theta[:, 1:2])
+    tau = np.exp(theta[:, 2:3])
+
+    z = (x - mu) / sigma - sigma / tau
+    log_cdf = special.log_ndtr(z)
+    log_f = (-theta[:, 2:3] + (mu - x) / tau
+             + sigma ** 2 / (2 * tau ** 2) + log_cdf)
+    # Ratio of normal density to cdf at z.
+    ratio = np.exp(-0.5 * z ** 2 - _LOG_SQRT_2PI - log_cdf)
+
+    d_mu = 1 / tau - ratio / sigma
+    d_sigma = sigma / tau ** 2 - ratio * ((x - mu) / sigma ** 2 + 1 / tau)
+    d_tau = (-1 / tau - (mu - x) / tau ** 2 - sigma ** 2 / tau ** 3
+             + ratio * sigma / tau ** 2)
+
+    def total(values):
+        return np.where(mask, values, 0).sum(axis=1) / n
+
+    nll = -total(log_f)
+    grad = -np.column_stack([
+                             total(d_mu),
+                             total(d_sigma) * sigma[:, 0],
+                             total(d_tau) * tau[:, 0]
+                             ])
+    return nll, grad
+
+
+def _lognormal_start(x, mask):
+    """Starting log gap (min(x) - shift) per group, (groups, 1)."""
+
+    mean, var, skew = _moments(x, mask)
+    low = np.where(mask, x, np.inf).min(axis=1)
+    gap = np.maximum(0.5 * (mean - low), 1e-3 * np.sqrt(var) + 1e-9)
+    return np.log(gap)[:, np.newaxis]
+
+
+def _lognormal_profile(eta, x, mask, n):
+    """Profile mean negative log likelihood of a shifted lognormal
+    for every group, and gradients in eta.
+
+    The shift is min(x) - exp(eta), log scale mean and sd are
+    profiled out in closed form.
+    """
+
+    eta = eta.reshape(-1)
+    low = np.where(mask, x, np.inf).min(axis=1)
+    gap = np.exp(eta)
+    shift = (low - gap)[:, np.newaxis]
+
+    above = np.where(mask, x - shift, 1.0)
+    y = np.log(above)
+    m = np.where(mask, y, 0).sum(axis=1) / n
+    centred = np.where(mask, y - m[:, np.newaxis], 0)
+    s2 = (centred ** 2).sum(axis=1) / n
+
+    nll = 0.5 * np.log(s2) + m + 0.5 + _LOG_SQRT_2PI
+    inverse = np.where(mask, 1 / above, 0)
+    d_shift = (-(centred * inverse).sum(axis=1) / n / s2
+               - inverse.sum(axis=1) / n)
+    return nll, (d_shift * -gap)[:, np.newaxis]
+
+
+def _lognormal_params(eta, x, mask):
+    """Returns shift, m and s from fitted eta."""
+
+    n = mask.sum(axis=1)
+    low = np.where(mask, x, np.inf).min(axis=1)
+    shift = low - np.exp(eta[:, 0])
+    y = np.log(np.where(mask, x - shift[:, np.newaxis], 1.0))
+    m = np.where(mask, y, 0).sum(axis=1) / n
+    s = np.sqrt((np.where(mask, y - m[:, np.newaxis], 0) ** 2)
+                .sum(axis=1) / n)
+    return np.column_stack([shift, m, s])
+
+
+def _newton(objective, theta, x, mask, n, max_iter, tol):
+    """Minimises every group's objective in lockstep.
+
+    A Levenberg-Marquardt damped Newton step is taken for all
+    unconverged groups at once. Hessians come from differencing
+    the analytic gradients, solved as a stack of small systems.
+    Steps that do not lower a group's objective are rejected and
+    that group's damping is raised.
+
+    Returns
+    -------
+    theta : ndarray
+        Parameters (groups, p).
+    nll : ndarray
+        Mean negative log likelihood at `theta`.
+    converged : ndarray
+        True where the gradient is below `tol`.
+    """
+
+    theta = theta.copy()
+    groups, n_params = theta.shape
+    nll, grad = objective(theta, x, mask, n)
+    damping = np.full(groups, 1e-3)
+    eye = np.eye(n_params)
+    step_size = 1e-6
+
+    for iteration in range(max_iter):
+        converged = np.abs(grad).max(axis=1) < tol
+        active = np.flatnonzero(~converged & (damping < 1e12))
+        if not active.size:
+            break
+
+        t_a, x_a, m_a, n_a = theta[active], x[active], mask[active], n[active]
+        g_a = grad[active]
+
+        hessian = np.empty((active.size, n_params, n_params))
+        for j in range(n_params):
+            shifted = t_a.copy()
+            shifted[:, j] += step_size
+            hessian[:, :, j] = (objective(shifted, x_a, m_a, n_a)[1]
+                                - g_a) / step_size
+        hessian = 0.5 * (hessian + hessian.transpose(0, 2, 1))
+
+        damped = hessian + damping[active, np.newaxis, np.newaxis] * eye
+        try:
+            step = np.linalg.solve(damped, -g_a[:, :, np.newaxis])[:, :, 0]
+        except np.linalg.LinAlgError:
+            step = -g_a
+
+        trial = t_a + step
+        with np.errstate(all='ignore'):
+            nll_trial, grad_trial = objective(trial, x_a, m_a, n_a)
+        better = np.isfinite(nll_trial) & (nll_trial <= nll[active])
+
+        accepted = active[better]
+        theta[accepted] = trial[better]
+        nll[accepted] = nll_trial[better]
+        grad[accepted] = grad_trial[better]
+        damping[accepted] = np.maximum(damping[accepted] / 10., 1e-12)
+        damping[active[~better]] *= 10.
+
+    converged = np.abs(grad).max(axis=1) < tol
+    return theta, nll, converged
+
+
+def _fit_batch(job):
+    """Fits one batch of groups, run in a worker process."""
+
+    model, x, mask, start, max_iter, tol = job
+    n = mask.sum(axis=1)
+
+    if model == 'exgauss':
+        objective = _exgauss_objective
+    else:
+        objective = _lognormal_profile
+
+    theta, nll, converged = _newton(objective, start, x, mask, n,
+                                    max_iter, tol)
+
+    if model == 'exgauss':
+        params = np.column_stack([theta[:, 0], np.exp(theta[:, 1]),
+                                  np.exp(theta[:, 2])])
+    else:
+        params = _lognormal_params(theta, x, mask)
+
+    return params, nll * n, converged
+
+
+def _fit(model, data, value, by, initial, batch_size, workers,
+         max_iter, tol):
+    """Shared driver of `fit_exgauss` and `fit_shifted_lognormal`."""
+
+    keys, x, mask = _padded_groups(data, value, by)
+    n = mask.sum(axis=1)
+
+    if model == 'exgauss':
+        start = _exgauss_start(x, mask)
+        names = EXGAUSS_PARAMS
+    else:
+        start = _lognormal_start(x, mask)
+        names = LOGNORMAL_PARAMS
+
+    if initial is not None:
+        # Warm start from earlier fits where the group is known.
+        warm = pd.DataFrame(initial).reindex(keys)
+        known = warm[list(names)].notna().all(axis=1).to_numpy()
+        if model == 'exgauss':
+            guess = np.column_stack([warm['mu'], np.log(warm['sigma']),
+                                     np.log(warm['tau'])])
+        else:
+            low = np.where(mask, x, np.inf).min(axis=1)
+            gap = np.maximum(low - warm['shift'].to_numpy(), 1e-9)
+            guess = np.log(gap)[:, np.newaxis]
+        start[known] = guess[known]
+
+    jobs = []
+    for first in range(0, x.shape[0], batch_size):
+        rows = slice(first, first + batch_size)
+        # Trim padding to the largest group in the batch.
+        width = max(int(n[rows].max()), 1)
+        jobs.append((model, x[rows, :width], mask[rows, :width],
+                     start[rows], max_iter, tol))
+
+    if workers == 1 or len(jobs) == 1:
+        results = [_fit_batch(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_fit_batch, jobs))
+
+    params = np.vstack([r[0] for r in results])
+    fits = pd.DataFrame(params, index=keys, columns=list(names))
+    fits['n'] = n
+    fits['nll'] = np.concatenate([r[1] for r in results])
+    fits['converged'] = np.concatenate([r[2] for r in results])
+    return fits
+
+
+def fit_exgauss(data, value='rt', by=('participant', 'condition'),
+                initial=None, batch_size=10000, workers=1,
+                max_iter=100, tol=1e-6):
+    """Fits an ex-Gaussian distribution to every group.
+
+    Parameters
+    ----------
+    data : DataFrame/structured ndarray
+        Long format data, one row per observation, e.g.
+        `synthetic.trials`.
+    value : string
+        Column of reaction times.
+    by : list
+        Columns identifying a group, e.g. participant and
+        condition.
+    initial : None/DataFrame
+        Earlier fits indexed by group with mu, sigma and tau,
+        used as warm starts where available.
+    batch_size : int
+        Groups optimised together.
+    workers : None/int
+        Processes for the batches, 1 runs in this process and
+        None uses all cores.
+    max_iter : int
+        Newton iterations per batch.
+    tol : float
+        Tolerance on the gradient of each group's mean
+        negative log likelihood.
+
+    Returns
+    -------
+    fits : DataFrame
+        Indexed by group with mu, sigma, tau, n, nll (negative
+        log likelihood) and converged. Groups whose likelihood
+        keeps rising as sigma shrinks to 0 are not converged.
+    """
+
+    return _fit('exgauss', data, value, by, initial, batch_size,
+                workers, max_iter, tol)
+
+
+def fit_shifted_lognormal(data, value='rt', by=('participant', 'condition'),
+                          initial=None, batch_size=10000, workers=1,
+                          max_iter=100, tol=1e-6):
+    """Fits a shifted lognormal distribution to every group.
+
+    The log scale mean and sd are profiled out in closed form so
+    only the shift is optimised. See `fit_exgauss` for the
+    parameters, `initial` needs a shift column.
+
+    Returns
+    -------
+    fits : DataFrame
+        Indexed by group with shift, m, s, n, nll and converged.
+    """
+
+    return _fit('lognormal', data, value, by, initial, batch_size,
+                workers, max_iter, tol)
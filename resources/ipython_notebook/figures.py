@@ -9,10 +9,16 @@
 """
 from __future__ import print_function
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import seaborn as sns
 import numpy as np
 from scipy import stats
 
+from comparisons import comparison_matrix
+from paired import limits_of_agreement
+from precision import working_dtype
+from theoretical import distribution_name, probplot
+
 # Color schemes
 custom_bw = ['#192231', '#3C3C3C', '#CDCDCD', '#494E6B']
 
@@ -201,6 +207,9 @@ def univariate(
     x_truncation_lower : None/int/float
         Number to set lower limit of the x-axis.
         None means automatically set.
+    ax : None/matplotlib axes
+        Axes to draw on. None creates a new figure
+        of `ax_size` with a single axes.
 
     Returns
     -------
@@ -212,6 +221,12 @@ def univariate(
 
     common_set_up(ax_size)  # Apply basic plot style
 
+    # Never draw on pyplot's current axes, a standalone
+    # plot gets its own figure.
+    standalone = ax is None
+    if standalone:
+        ax = plt.figure(figsize=ax_size).add_subplot(111)
+
     # Calulate the range of values
     # and use this as the number of bins.
     #
@@ -258,7 +273,7 @@ def univariate(
     #
     # Title will be added to figure with all sub-plots
     # instead in this case.
-    if ax is None:
+    if standalone:
         fig.set_title(
                       ('Distribution of {0}'.format(univariate_name) + rugstr),
                       fontsize=20,
@@ -309,9 +324,9 @@ def univariate(
 
     # Will not work on multiple subplots within a figure
     # gives an error instead.
-    if ax is None:
+    if standalone:
         # Seaborn despine to remove boundaries around plot
-        sns.despine(offset=2, trim=True, left=True, bottom=True)
+        sns.despine(ax=fig, offset=2, trim=True, left=True, bottom=True)
 
     return fig
 
@@ -321,7 +336,8 @@ def boolean_bar(
                 name,
                 color_set=custom_bw,
                 ax_size=(2, 5),
-                annotate=True
+                annotate=True,
+                ax=None
                 ):
     """
     A plotted bar chart for a True/False question.
@@ -345,6 +361,9 @@ def boolean_bar(
     annotate : boolean
         True uses annotation.
         False turns it off.
+    ax : None/matplotlib axes
+        Axes to draw on. None creates a new figure
+        of `ax_size` with a single axes.
 
     Returns
     -------
@@ -356,15 +375,19 @@ def boolean_bar(
 
     common_set_up(ax_size)  # Apply basic plot style
 
+    if ax is None:
+        ax = plt.figure(figsize=ax_size).add_subplot(111)
+
     fig = sns.countplot(
                         data,
                         saturation=1,
                         color=color_set[2],
-                        label=name
+                        label=name,
+                        ax=ax
                         )
 
     # Trims off unnecessary parts of the figure
-    sns.despine(offset=2, trim=True, left=True, bottom=True)
+    sns.despine(ax=fig, offset=2, trim=True, left=True, bottom=True)
 
     # Set title and axes
     title_color = '#192231'  # Dark grey
@@ -398,7 +421,7 @@ def boolean_bar(
     return fig
 
 
-def qq_plot(data, name, distribution="norm", ax_size=(7, 7)):
+def qq_plot(data, name, distribution="norm", ax_size=(7, 7), ax=None):
     """
     Creates a qq (quantile quantile) plot using one data
     value against an ideal distribution, like the normal
@@ -411,21 +434,31 @@ def qq_plot(data, name, distribution="norm", ax_size=(7, 7)):
         Should be an array of booleans.
     name : string
         String describing the input data.
-    distribution : string
+    distribution : string/scipy distribution
         string of scipy distributions accepted by
-        scipy.stats.probplot
+        scipy.stats.probplot, or a frozen distribution
+        such as one fitted by `exgauss`.
     ax_size : tuple
         tuple containing ax size. First value is
         width, second value is height.
+    ax : None/matplotlib axes
+        Axes to draw on. None creates a new figure
+        of `ax_size` with a single axes.
+
+    Returns
+    -------
+    ax : matplotlib axes
     """
 
     common_set_up(ax_size)
 
-    fig = plt.figure(figsize=ax_size)
-    ax = fig.add_subplot(111)  # Make one axes
+    if ax is None:
+        fig = plt.figure(figsize=ax_size)
+        ax = fig.add_subplot(111)  # Make one axes
 
-    # Use scipy stats probplot and get out only values
-    (x, y) = stats.probplot(data, dist=distribution, plot=None, fit=False)
+    # Like scipy stats probplot, with the theoretical
+    # quantiles shared through `theoretical.DEFAULT_CACHE`.
+    (x, y) = probplot(data, distribution)
 
     # Add a best fit line to the plot.
     #
@@ -452,6 +485,8 @@ def qq_plot(data, name, distribution="norm", ax_size=(7, 7)):
     title_color = '#192231'  # Dark grey
     font_colour = '#9099A2'  # Light grey
 
+    dist_name = distribution_name(distribution)
+
     ax.set_title(
                  "Q-Q plot of {0}".format(name),
                  fontsize=20,
@@ -462,14 +497,17 @@ def qq_plot(data, name, distribution="norm", ax_size=(7, 7)):
                   color=font_colour
                   )
     ax.set_xlabel(
-                  'Quantiles of {0} dist.'.format(distribution),
+                  'Quantiles of {0} dist.'.format(dist_name),
                   color=font_colour
                   )
 
     sns.despine(ax=ax, offset=2, trim=True, left=True, bottom=True)
 
+    return ax
+
 
-def qq_plot_var(data_a, data_b, name_a, name_b, ax_size=(7, 7), fit_zero=True):
+def qq_plot_var(data_a, data_b, name_a, name_b, ax_size=(7, 7),
+                fit_zero=True, ax=None):
     """
     Creates a qq (quantile quantile) plot comparing two data
     values against each other.
@@ -494,12 +532,20 @@ def qq_plot_var(data_a, data_b, name_a, name_b, ax_size=(7, 7), fit_zero=True):
     fit_zero : boolean
         True will fit expand the plot to include 0, 0.
         False will automatically fit the plot scales to the data.
+    ax : None/matplotlib axes
+        Axes to draw on. None creates a new figure
+        of `ax_size` with a single axes.
+
+    Returns
+    -------
+    ax : matplotlib axes
     """
 
     common_set_up(ax_size)
 
-    fig = plt.figure(figsize=ax_size)
-    ax = fig.add_subplot(111)  # Make one plot within a figure
+    if ax is None:
+        fig = plt.figure(figsize=ax_size)
+        ax = fig.add_subplot(111)  # Make one plot within a figure
 
     # Manually calculate quantiles from 1 to 100.
     x = []
@@ -555,3 +601,545 @@ def qq_plot_var(data_a, data_b, name_a, name_b, ax_size=(7, 7), fit_zero=True):
     sns.despine(ax=ax, offset=2, trim=True, left=True, bottom=True)
 
     return ax
+
+
+def comparison_heatmap(
+                       results,
+                       value='t',
+                       ax_size=(8, 7),
+                       annotate=True,
+                       ax=None
+                       ):
+    """
+    Creates a heatmap of all pairwise condition comparisons.
+
+    Cells where the corrected test is significant are
+    annotated in bold.
+
+    Parameters
+    ----------
+    results : DataFrame
+        Output of `comparisons.pairwise_tests`.
+    value : string
+        Column of `results` to show, e.g. 't', 'p_adjusted'
+        or 'cohen_d'.
+    ax_size : tuple
+        tuple containing ax size. First value is
+        width, second value is height.
+    annotate : boolean
+        True writes the value in each cell.
+    ax : None/matplotlib axes
+        Axes to draw on. None creates a new figure
+        of `ax_size` with a single axes.
+
+    Returns
+    -------
+    ax : matplotlib axes
+    """
+
+    common_set_up(ax_size)
+
+    if ax is None:
+        ax = plt.figure(figsize=ax_size).add_subplot(111)
+
+    matrix = comparison_matrix(results, value)
+    reject = comparison_matrix(results, 'reject').values == 1
+
+    # Signed statistics are centred on zero, p values
+    # run from dark (small) to light.
+    if value in ('p', 'p_adjusted'):
+        cmap = sns.light_palette('#192231', reverse=True, as_cmap=True)
+        centre = None
+    else:
+        cmap = sns.diverging_palette(240, 10, as_cmap=True)
+        centre = 0
+
+    sns.heatmap(
+                matrix,
+                ax=ax,
+                cmap=cmap,
+                center=centre,
+                annot=annotate,
+                fmt='.2g',
+                square=True,
+                linewidths=0.5,
+                linecolor='white',
+                cbar_kws={'shrink': 0.7}
+                )
+
+    if annotate:
+        for text in ax.texts:
+            row = int(text.get_position()[1])
+            col = int(text.get_position()[0])
+            if reject[row, col]:
+                text.set_fontweight('bold')
+
+    title_color = '#192231'  # Dark grey
+    ax.set_title(
+                 'Pairwise comparisons, {0}'.format(value),
+                 fontsize=20,
+                 color=title_color
+                 )
+
+    return ax
+
+
+def batched_histograms(data, bins=10, x_lower=None, x_upper=None,
+                       dtype='float64'):
+    """
+    Computes histograms of many columns on shared bin edges
+    in one pass.
+
+    All bin indices come from a single `searchsorted` over the
+    stacked values and all counts from a single `bincount`.
+
+    Parameters
+    ----------
+    data : array_like
+        2-D array or pandas dataframe, one column per variable.
+        Missing values are ignored.
+    bins : int
+        Number of bins shared by every column.
+    x_lower : None/int/float
+        Left edge of the first bin, None uses the smallest value.
+    x_upper : None/int/float
+        Right edge of the last bin, None uses the largest value.
+    dtype : string
+        'float64', or 'float32' to bin in reduced precision.
+        Counts can differ only for values within float32
+        rounding of an edge.
+
+    Returns
+    -------
+    counts : ndarray
+        Array of shape (columns, bins).
+    edges : ndarray
+        Array of bins + 1 shared edges.
+    """
+
+    dtype = working_dtype(dtype)
+    x = np.asarray(data, dtype=dtype)
+    if x.ndim == 1:
+        x = x[:, np.newaxis]
+
+    if x_lower is None:
+        x_lower = np.nanmin(x)
+    if x_upper is None:
+        x_upper = np.nanmax(x)
+    if x_upper <= x_lower:
+        x_upper = x_lower + 1.0
+    # Edges of the same dtype, so the values are not copied
+    # to a wider type by searchsorted.
+    edges = np.linspace(x_lower, x_upper, bins + 1).astype(dtype)
+
+    # The right edge belongs to the last bin, as in np.histogram.
+    index = np.searchsorted(edges, x, side='right') - 1
+    index[x == edges[-1]] = bins - 1
+    inside = (index >= 0) & (index < bins) & ~np.isnan(x)
+
+    column = np.broadcast_to(np.arange(x.shape[1]), x.shape)
+    flat = column[inside] * bins + index[inside]
+    counts = np.bincount(flat, minlength=x.shape[1] * bins)
+
+    return counts.reshape(x.shape[1], bins), edges
+
+
+def univariate_grid(
+                    data,
+                    names=None,
+                    x_label='Value',
+                    color_set=custom_bw,
+                    bins=20,
+                    n_cols=3,
+                    ax_size=(4, 3),
+                    x_truncation_upper=None,
+                    x_truncation_lower=None,
+                    fig=None,
+                    dtype='float64'
+                    ):
+    """
+    Creates a grid of histograms, one panel per column, on
+    shared bins and shared axes so every panel is comparable.
+
+    Parameters
+    ----------
+    data : DataFrame
+        pandas DataFrame, one column per variable.
+    names : None/list
+        Panel titles, None uses the column headers.
+    x_label : string
+        Label of the shared x axis, include units.
+    color_set : list
+        list of three colors to be used in plot
+    bins : int
+        Number of bins shared by every panel.
+    n_cols : int
+        Number of panels per row.
+    ax_size : tuple
+        Size of one panel. First value is width, second
+        value is height.
+    x_truncation_upper : None/int/float
+        Number to set upper limit of the x-axis.
+        None means automatically set.
+    x_truncation_lower : None/int/float
+        Number to set lower limit of the x-axis.
+        None means automatically set.
+    fig : None/matplotlib Figure
+        Empty figure to draw on, None creates a new one.
+    dtype : string
+        'float64' or 'float32', see `batched_histograms`.
+
+    Returns
+    -------
+    fig : matplotlib Figure
+    """
+
+    if names is None:
+        names = [str(c) for c in data.columns]
+
+    counts, edges = batched_histograms(
+                                       data,
+                                       bins=bins,
+                                       x_lower=x_truncation_lower,
+                                       x_upper=x_truncation_upper,
+                                       dtype=dtype
+                                       )
+
+    n_panels = counts.shape[0]
+    n_rows = int(np.ceil(n_panels / float(n_cols)))
+    n_cols = min(n_cols, n_panels)
+    fig_size = (ax_size[0] * n_cols, ax_size[1] * n_rows)
+
+    common_set_up(fig_size)
+
+    if fig is None:
+        fig = plt.figure(figsize=fig_size)
+    axes = fig.subplots(n_rows, n_cols, sharex=True, sharey=True,
+                        squeeze=False)
+
+    title_color = '#192231'  # Dark grey
+    font_colour = '#9099A2'  # Light grey
+    widths = np.diff(edges)
+
+    for i, ax in enumerate(axes.flat):
+        if i >= n_panels:
+            ax.set_visible(False)
+            continue
+
+        ax.bar(
+               edges[:-1],
+               counts[i],
+               width=widths,
+               align='edge',
+               color=color_set[2],
+               edgecolor='white',  # Edge hist. bars.
+               linewidth=1
+               )
+        ax.set_title(
+                     '{0}'.format(names[i]),
+                     fontsize=14,
+                     color=title_color
+                     )
+        sns.despine(ax=ax, offset=2, left=True, bottom=True)
+
+    # Label only the outer panels, the axes are shared. The
+    # lowest visible panel of each column carries the x label and
+    # tick labels, those of a short last row are hidden.
+    for column in range(n_cols):
+        ax = axes[(n_panels - 1 - column) // n_cols, column]
+        ax.set_xlabel(x_label, color=font_colour)
+        ax.xaxis.set_tick_params(which='both', labelbottom=True)
+    for ax in axes[:, 0]:
+        ax.set_ylabel('Frequency', color=font_colour)
+
+    ax = axes.flat[0]
+    ax.set_xlim(edges[0], edges[-1])
+    formatting_text_box(
+                        ax,
+                        'Formatting:\nbins = {0}'.format(bins),
+                        formatting_right=True
+                        )
+
+    fig.tight_layout()
+
+    return fig
+
+
+def binned_counts_2d(x, y, bins=100, x_range=None, y_range=None):
+    """
+    Counts paired values on a regular 2-D grid, like
+    np.histogram2d, with a single `bincount`.
+
+    Parameters
+    ----------
+    x, y : ndarray
+        Paired values without missing values.
+    bins : int
+        Number of bins along each axis.
+    x_range, y_range : None/tuple
+        (lower, upper) of the grid, None uses the data range.
+        Values outside are not counted.
+
+    Returns
+    -------
+    counts : ndarray
+        Array of shape (bins, bins), first index along x.
+    x_edges, y_edges : ndarray
+        Arrays of bins + 1 edges.
+    """
+
+    def _edges(v, v_range):
+        lower, upper = v_range if v_range else (v.min(), v.max())
+        if upper <= lower:
+            upper = lower + 1.0
+        return np.linspace(lower, upper, bins + 1)
+
+    x_edges = _edges(x, x_range)
+    y_edges = _edges(y, y_range)
+
+    # Bin positions by scaling, the upper edge belongs
+    # to the last bin as in np.histogram2d.
+    i = np.floor((x - x_edges[0]) / (x_edges[-1] - x_edges[0]) * bins)
+    j = np.floor((y - y_edges[0]) / (y_edges[-1] - y_edges[0]) * bins)
+    i[x == x_edges[-1]] = bins - 1
+    j[y == y_edges[-1]] = bins - 1
+    inside = (i >= 0) & (i < bins) & (j >= 0) & (j < bins)
+
+    flat = i[inside].astype(np.intp) * bins + j[inside].astype(np.intp)
+    counts = np.bincount(flat, minlength=bins * bins)
+
+    return counts.reshape(bins, bins), x_edges, y_edges
+
+
+def _paired_values(data_a, data_b):
+    """Returns two float arrays, pairs with a missing value dropped."""
+
+    a = np.asarray(data_a, dtype=float).ravel()
+    b = np.asarray(data_b, dtype=float).ravel()
+    keep = ~(np.isnan(a) | np.isnan(b))
+    return a[keep], b[keep]
+
+
+def _draw_pairs(ax, x, y, max_points, bins, color_set):
+    """
+    Scatters the points, or above `max_points` draws
+    their binned counts as a shaded grid.
+
+    Returns True when the points were binned.
+    """
+
+    if x.size <= max_points:
+        ax.scatter(
+                   x,
+                   y,
+                   s=40,  # Scale of scatter point
+                   facecolors='none',  # Transparent fill
+                   edgecolors=color_set[0],
+                   linewidths=0.5
+                   )
+        return False
+
+    counts, x_edges, y_edges = binned_counts_2d(x, y, bins)
+    # Empty bins stay white.
+    counts = np.ma.masked_equal(counts, 0)
+    cmap = sns.light_palette(color_set[0], as_cmap=True)
+    mesh = ax.pcolormesh(
+                         x_edges,
+                         y_edges,
+                         counts.T,
+                         cmap=cmap,
+                         norm=LogNorm(),
+                         rasterized=True
+                         )
+    ax.figure.colorbar(mesh, ax=ax, shrink=0.7, label='Pairs per bin')
+    return True
+
+
+def bland_altman(
+                 data_a,
+                 data_b,
+                 name_a,
+                 name_b,
+                 color_set=custom_bw,
+                 k=1.96,
+                 max_points=10000,
+                 bins=100,
+                 ax_size=(9, 7),
+                 ax=None
+                 ):
+    """
+    Creates a Bland-Altman plot, the difference of each pair
+    against its mean, with the bias and limits of agreement.
+
+    Above `max_points` pairs the points are drawn as binned
+    counts, so plots of millions of pairs stay small and
+    readable.
+
+    Parameters
+    ----------
+    data_a : array_like
+        List, pandas series, pandas dataframe column.
+    data_b : array_like
+        Paired values of the same length as `data_a`,
+        differences are data_a - data_b.
+    name_a : string
+        String describing the input data_a.
+    name_b : string
+        String describing the input data_b.
+    color_set : list
+        list of three colors to be used in plot
+    k : float
+        Width of the limits of agreement in standard
+        deviations of the difference.
+    max_points : int
+        Largest number of pairs drawn as points.
+    bins : int
+        Number of bins along each axis when binned.
+    ax_size : tuple
+        tuple containing ax size. First value is
+        width, second value is height.
+    ax : None/matplotlib axes
+        Axes to draw on. None creates a new figure
+        of `ax_size` with a single axes.
+
+    Returns
+    -------
+    ax : matplotlib axes
+    """
+
+    common_set_up(ax_size)
+
+    if ax is None:
+        ax = plt.figure(figsize=ax_size).add_subplot(111)
+
+    a, b = _paired_values(data_a, data_b)
+    mean = (a + b) / 2.
+    difference = a - b
+    agreement = limits_of_agreement(difference, k)
+
+    binned = _draw_pairs(ax, mean, difference, max_points, bins, color_set)
+
+    font_colour = '#9099A2'  # Light grey
+    for value, style in ((agreement.bias, '-'), (agreement.lower, '--'),
+                         (agreement.upper, '--')):
+        ax.axhline(value, color=font_colour, linestyle=style, linewidth=1)
+
+    title_color = '#192231'  # Dark grey
+    ax.set_title(
+                 "Bland-Altman plot of {0} vs {1}".format(name_a, name_b),
+                 fontsize=20,
+                 color=title_color
+                 )
+    ax.set_xlabel(
+                  'Mean of {0} and {1}'.format(name_a, name_b),
+                  color=font_colour
+                  )
+    ax.set_ylabel(
+                  '{0} - {1}'.format(name_a, name_b),
+                  color=font_colour
+                  )
+
+    parameters = (
+                  'n = {0}\n'.format(agreement.n)
+                  + 'bias = {0:.2f}\n'.format(agreement.bias)
+                  + 'limits = {0:.2f}, {1:.2f}'.format(agreement.lower,
+                                                       agreement.upper)
+                  + ('\nbinned, {0} x {0}'.format(bins) if binned else '')
+                  )
+    formatting_text_box(ax, parameters, formatting_right=False)
+
+    sns.despine(ax=ax, offset=2, left=True, bottom=True)
+
+    return ax
+
+
+def paired_scatter(
+                   data_a,
+                   data_b,
+                   name_a,
+                   name_b,
+                   color_set=custom_bw,
+                   max_points=10000,
+                   bins=100,
+                   ax_size=(7, 7),
+                   ax=None
+                   ):
+    """
+    Creates a scatter plot of paired values with the line
+    of equality, counting the pairs on each side of it.
+
+    Above `max_points` pairs the points are drawn as binned
+    counts.
+
+    Parameters
+    ----------
+    data_a : array_like
+        List, pandas series, pandas dataframe column.
+        Corresponds to the x-axis.
+    data_b : array_like
+        Paired values of the same length as `data_a`.
+        Corresponds to the y-axis.
+    name_a : string
+        String describing the input data_a.
+    name_b : string
+        String describing the input data_b.
+    color_set : list
+        list of three colors to be used in plot
+    max_points : int
+        Largest number of pairs drawn as points.
+    bins : int
+        Number of bins along each axis when binned.
+    ax_size : tuple
+        tuple containing ax size. First value is
+        width, second value is height.
+    ax : None/matplotlib axes
+        Axes to draw on. None creates a new figure
+        of `ax_size` with a single axes.
+
+    Returns
+    -------
+    ax : matplotlib axes
+    """
+
+    common_set_up(ax_size)
+
+    if ax is None:
+        ax = plt.figure(figsize=ax_size).add_subplot(111)
+
+    a, b = _paired_values(data_a, data_b)
+    binned = _draw_pairs(ax, a, b, max_points, bins, color_set)
+
+    # Line of equality, y = 1x + 0
+    lower = min(a.min(), b.min())
+    upper = max(a.max(), b.max())
+    font_colour = '#9099A2'  # Light grey
+    ax.plot(
+            [lower, upper],
+            [lower, upper],
+            font_colour,
+            linestyle='--',  # Dashed line style
+            linewidth=1
+            )
+
+    title_color = '#192231'  # Dark grey
+    ax.set_title(
+                 "{0} vs {1}".format(name_b, name_a),
+                 fontsize=20,
+                 color=title_color
+                 )
+    ax.set_xlabel('{0}'.format(name_a), color=font_colour)
+    ax.set_ylabel('{0}'.format(name_b), color=font_colour)
+
+    parameters = (
+                  'n = {0}\n'.format(a.size)
+                  + '{0} > {1}: {2}\n'.format(name_a, name_b,
+                                              int((a > b).sum()))
+                  + '{0} > {1}: {2}'.format(name_b, name_a,
+                                            int((b > a).sum()))
+                  + ('\nbinned, {0} x {0}'.format(bins) if binned else '')
+                  )
+    formatting_text_box(ax, parameters, formatting_right=False)
+
+    sns.despine(ax=ax, offset=2, left=True, bottom=True)
+
+    return ax
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    lifecycle
+    ~~~~~~~~~
+
+    This module provides a managed pool of matplotlib figures so
+    that long running batches reuse or close every figure they
+    create, keeping memory bounded.
+
+    Example::
+
+        with FigurePool(max_size=2) as pool:
+            for column in columns:
+                fig = pool.acquire((7, 7))
+                qq_plot(df[column], column, ax=fig.add_subplot(111))
+                pool.save(fig, column + '.png')
+"""
+from __future__ import print_function
+from contextlib import contextmanager
+import matplotlib.pyplot as plt
+
+
+class FigurePool(object):
+    """A bounded pool of reusable matplotlib figures.
+
+    Figures are handed out by `acquire` and must come back through
+    `release` or `save`. Returned figures are cleared and kept for
+    reuse up to `max_size`, any others are closed at once so pyplot
+    never holds on to them.
+
+    Parameters
+    ----------
+    max_size : int
+        Largest number of idle figures kept for reuse.
+    fig_size : tuple
+        Default figure size, width then height.
+    dpi : None/int
+        Resolution of new figures, None uses the rc setting.
+
+    Attributes
+    ----------
+    created : int
+        Number of figures created by the pool.
+    reused : int
+        Number of times an idle figure was handed out again.
+    closed : int
+        Number of figures closed by the pool.
+    """
+
+    def __init__(self, max_size=4, fig_size=(8, 8), dpi=None):
+        self.max_size = max_size
+        self.fig_size = fig_size
+        self.dpi = dpi
+        self._idle = []
+        self._busy = {}
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Number of figures currently open through the pool."""
+        return len(self._idle) + len(self._busy)
+
+    def acquire(self, fig_size=None):
+        """Returns an empty figure owned by the caller.
+
+        Parameters
+        ----------
+        fig_size : None/tuple
+            Width and height in inches, None uses the pool default.
+
+        Returns
+        -------
+        fig : matplotlib Figure
+        """
+
+        if fig_size is None:
+            fig_size = self.fig_size
+
+        if self._idle:
+            fig = self._idle.pop()
+            fig.set_size_inches(fig_size, forward=False)
+            self.reused += 1
+        else:
+            fig = plt.figure(figsize=fig_size, dpi=self.dpi)
+            self.created += 1
+
+        self._busy[id(fig)] = fig
+        return fig
+
+    def release(self, fig):
+        """Returns a figure to the pool, clearing or closing it.
+
+        Parameters
+        ----------
+        fig : matplotlib Figure
+            A figure previously handed out by `acquire`.
+        """
+
+        if self._busy.pop(id(fig), None) is None:
+            raise ValueError("figure was not acquired from this pool")
+
+        if len(self._idle) < self.max_size:
+            fig.clf()
+            self._idle.append(fig)
+        else:
+            plt.close(fig)
+            self.closed += 1
+
+    def save(self, fig, fname, release=True, **kwargs):
+        """Saves a figure then releases it back to the pool.
+
+        Parameters
+        ----------
+        fig : matplotlib Figure
+            A figure previously handed out by `acquire`.
+        fname : string or file-like
+            Passed to `Figure.savefig`.
+        release : boolean
+            True releases the figure once saved.
+        **kwargs
+            Passed to `Figure.savefig`.
+        """
+
+        try:
+            fig.savefig(fname, **kwargs)
+        finally:
+            if release:
+                self.release(fig)
+
+    @contextmanager
+    def figure(self, fig_size=None):
+        """Context manager handing out a figure for one plot.
+
+        The figure is released when the block exits, also on
+        errors.
+        """
+
+        fig = self.acquire(fig_size)
+        try:
+            yield fig
+        finally:
+            if id(fig) in self._busy:
+                self.release(fig)
+
+    def close(self):
+        """Closes every figure owned by the pool."""
+
+        for fig in self._idle + list(self._busy.values()):
+            plt.close(fig)
+            self.closed += 1
+        self._idle = []
+        self._busy = {}
@@ -0,0 +1,372 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    paired
+    ~~~~~~
+
+    This module provides the dependent (paired) t test used in the
+    analysis, computed from the moments of the difference so it can
+    be fed from raw columns or from merged partial statistics.
+"""
+from __future__ import print_function
+from collections import namedtuple
+import numpy as np
+from scipy import stats
+
+from precision import moments, working_dtype
+
+PairedTest = namedtuple('PairedTest', [
+                                       'n',
+                                       'mean_difference',
+                                       'sd_difference',
+                                       'sem',
+                                       't',
+                                       'd_free',
+                                       'p',
+                                       'ci_lower',
+                                       'ci_upper',
+                                       'cohen_d',
+                                       'r_squared'
+                                       ])
+
+# Standardised effects with exact confidence bounds, d_z is the
+# mean difference over the sd of the differences, d_av over the
+# average sd of the two conditions.
+EffectSizes = namedtuple('EffectSizes', [
+                                         'd_z',
+                                         'd_z_lower',
+                                         'd_z_upper',
+                                         'd_av',
+                                         'd_av_lower',
+                                         'd_av_upper',
+                                         'r_squared',
+                                         'r_squared_lower',
+                                         'r_squared_upper'
+                                         ])
+
+# Bland-Altman bias and limits of agreement, bias -/+ k sd.
+Agreement = namedtuple('Agreement', ['n', 'bias', 'sd_difference', 'lower',
+                                     'upper', 'k'])
+
+
+def paired_test_from_moments(n, mean_difference, sd_difference,
+                             confidence=0.95, alternative='two-sided'):
+    """Returns a paired t test from summary statistics.
+
+    Inputs broadcast, so many tests are computed at once.
+
+    Parameters
+    ----------
+    n : array_like
+        Number of pairs.
+    mean_difference : array_like
+        Mean of a - b.
+    sd_difference : array_like
+        Standard deviation (n - 1) of a - b.
+    confidence : float
+        Level of the two sided confidence interval around
+        the mean difference.
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+
+    Returns
+    -------
+    result : PairedTest
+        Cohen's d is the mean difference over the standard
+        deviation of the difference, r squared is t^2/(t^2 + df).
+    """
+
+    # Indexing with () turns 0-d arrays into scalars.
+    n = np.asarray(n, dtype=float)[()]
+    mean_difference = np.asarray(mean_difference, dtype=float)[()]
+    sd_difference = np.asarray(sd_difference, dtype=float)[()]
+
+    d_free = n - 1
+    sem = sd_difference / np.sqrt(n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = mean_difference / sem
+        cohen_d = mean_difference / sd_difference
+        r_squared = t ** 2 / (t ** 2 + d_free)
+
+    if alternative == 'two-sided':
+        p = 2 * stats.t.sf(np.abs(t), d_free)
+    elif alternative == 'less':
+        p = stats.t.cdf(t, d_free)
+    elif alternative == 'greater':
+        p = stats.t.sf(t, d_free)
+    else:
+        raise ValueError(
+                         "alternative must be 'two-sided', 'less' or "
+                         "'greater', not {0!r}".format(alternative)
+                         )
+
+    # Margin of error
+    t_crit = stats.t.ppf((1 + confidence) / 2., d_free)
+    m_error = t_crit * sem
+
+    return PairedTest(n, mean_difference, sd_difference, sem, t, d_free,
+                      p, mean_difference - m_error,
+                      mean_difference + m_error, cohen_d, r_squared)
+
+
+def paired_test(data_a, data_b, confidence=0.95, alternative='two-sided',
+                dtype='float64'):
+    """Returns a paired t test of data_a - data_b.
+
+    Pairs with a missing value are dropped.
+
+    Parameters
+    ----------
+    data_a : array_like
+        List, pandas series, pandas dataframe column.
+    data_b : array_like
+        Paired values of the same length as `data_a`.
+    confidence : float
+        Level of the two sided confidence interval.
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+    dtype : string
+        'float64', or 'float32' to compute in reduced precision
+        within `precision.FLOAT32_TOLERANCES`.
+
+    Returns
+    -------
+    result : PairedTest
+        Matches scipy.stats.ttest_rel for t and p.
+    """
+
+    dtype = working_dtype(dtype)
+    diff = (np.asarray(data_a, dtype=dtype)
+            - np.asarray(data_b, dtype=dtype))
+    n, mean, var = moments(diff)
+
+    return paired_test_from_moments(
+                                    n,
+                                    mean,
+                                    np.sqrt(var),
+                                    confidence=confidence,
+                                    alternative=alternative
+                                    )
+
+
+def limits_of_agreement(difference, k=1.96):
+    """Returns the Bland-Altman limits of agreement.
+
+    Parameters
+    ----------
+    difference : array_like
+        Paired differences a - b, missing values are ignored.
+    k : float
+        Width of the limits in standard deviations, 1.96
+        covers 95% of normal differences.
+
+    Returns
+    -------
+    result : Agreement
+    """
+
+    difference = np.asarray(difference, dtype=float)
+    difference = difference[~np.isnan(difference)]
+
+    bias = difference.mean()
+    sd_difference = difference.std(ddof=1)
+
+    return Agreement(difference.size, bias, sd_difference,
+                     bias - k * sd_difference, bias + k * sd_difference, k)
+
+
+def _nct_cdf(t, d_free, non_central):
+    """Noncentral t cdf, using cdf(t, nc) = sf(-t, -nc) for
+    negative t where scipy's cdf returns nan."""
+
+    return np.where(t < 0,
+                    stats.nct.sf(-t, d_free, -non_central),
+                    stats.nct.cdf(np.abs(t), d_free, non_central))
+
+
+def noncentrality_interval(t, d_free, confidence=0.95, xtol=1e-10,
+                           max_iter=100):
+    """Returns the confidence interval of a noncentrality parameter.
+
+    Inverts the noncentral t distribution, the lower bound is
+    the noncentrality with `t` at its (1 + confidence) / 2
+    quantile, the upper bound with `t` at its (1 - confidence) / 2
+    quantile. Every bound of every input is bracketed, then all
+    brackets are narrowed in lockstep by the Illinois method
+    (regula falsi that halves a stale end), one vectorized cdf
+    call per step over the bounds not yet converged.
+
+    Parameters
+    ----------
+    t : array_like
+        Observed t statistics.
+    d_free : array_like
+        Degrees of freedom, broadcast with `t`.
+    confidence : float
+        Level of the two sided interval.
+    xtol : float
+        A bound is converged once its bracket is narrower than
+        xtol * (1 + |bound|).
+    max_iter : int
+        Largest number of steps.
+
+    Returns
+    -------
+    lower, upper : ndarray
+        Bounds, nan where t or d_free is nan.
+    """
+
+    t, d_free = np.broadcast_arrays(np.asarray(t, dtype=float),
+                                    np.asarray(d_free, dtype=float))
+    shape = t.shape
+
+    # Both bounds are solved together, lower bounds first.
+    t = np.concatenate([t.ravel(), t.ravel()])
+    d_free = np.concatenate([d_free.ravel(), d_free.ravel()])
+    target = np.repeat([(1 + confidence) / 2., (1 - confidence) / 2.],
+                       t.size // 2)
+    valid = ~(np.isnan(t) | np.isnan(d_free))
+
+    def _excess(non_central, index):
+        # Decreasing in the noncentrality.
+        return (_nct_cdf(t[index], d_free[index], non_central)
+                - target[index])
+
+    # Bracket the normal approximation, t -/+ z sd(t), widening
+    # until every bracket holds a sign change.
+    index = np.flatnonzero(valid)
+    sd = np.sqrt(1 + t[index] ** 2 / (2 * d_free[index]))
+    guess = t[index] - stats.norm.ppf(target[index]) * sd
+    width = 0.25 * sd
+    low = guess - width
+    high = guess + width
+    f_low = _excess(low, index)
+    f_high = _excess(high, index)
+    for i in range(64):
+        short_low = f_low < 0
+        short_high = f_high > 0
+        if not (short_low.any() or short_high.any()):
+            break
+        for short, ends, values, sign in ((short_low, low, f_low, -1),
+                                          (short_high, high, f_high, 1)):
+            ends[short] += sign * width[short]
+            values[short] = _excess(ends[short], index[short])
+        width[short_low | short_high] *= 2
+
+    # -1 when the low end moved last, 1 for the high end.
+    side = np.zeros(index.size, dtype=int)
+    active = np.arange(index.size)
+    for i in range(max_iter):
+        done = ((high[active] - low[active])
+                <= xtol * (1 + np.abs(low[active])))
+        active = active[~done]
+        if active.size == 0:
+            break
+
+        a, b = low[active], high[active]
+        fa, fb = f_low[active], f_high[active]
+        x = b - fb * (b - a) / (fb - fa)
+        # Bisect where the secant step fails.
+        bad = ~((x > a) & (x < b))
+        x[bad] = ((a + b) / 2.)[bad]
+        fx = _excess(x, index[active])
+
+        move_low = fx > 0
+        move_high = fx < 0
+        exact = fx == 0
+        for which, ends, values in ((move_low | exact, low, f_low),
+                                    (move_high | exact, high, f_high)):
+            ends[active[which]] = x[which]
+            values[active[which]] = fx[which]
+
+        # Illinois, halve the value at an end kept twice running.
+        stale_high = move_low & (side[active] == -1)
+        stale_low = move_high & (side[active] == 1)
+        f_high[active[stale_high]] /= 2.
+        f_low[active[stale_low]] /= 2.
+        side[active[move_low]] = -1
+        side[active[move_high]] = 1
+
+    bound = np.full(t.size, np.nan)
+    bound[index] = (low + high) / 2.
+    lower, upper = bound.reshape((2,) + shape)
+    # Indexing with () turns 0-d arrays into scalars.
+    return lower[()], upper[()]
+
+
+def effect_size_intervals(test, sd_a=None, sd_b=None, confidence=0.95):
+    """Returns paired effect sizes with exact confidence intervals.
+
+    The d_z and r squared bounds come from
+    `noncentrality_interval` on the test's t, exact under
+    normally distributed differences. The d_av bounds rescale the
+    d_z bounds by sd_difference / sd_av, as in Cumming (2012), an
+    approximation.
+
+    Parameters
+    ----------
+    test : PairedTest
+        Output of `paired_test` or `paired_test_from_moments`,
+        array fields give many intervals at once.
+    sd_a, sd_b : None/array_like
+        Standard deviations of the two conditions, needed for
+        d_av (nan otherwise).
+    confidence : float
+        Level of the two sided intervals.
+
+    Returns
+    -------
+    result : EffectSizes
+        d_z equals `PairedTest.cohen_d`, r squared equals
+        `PairedTest.r_squared`.
+    """
+
+    n = np.asarray(test.n, dtype=float)
+    lower, upper = noncentrality_interval(test.t, test.d_free, confidence)
+    lower, upper = np.asarray(lower), np.asarray(upper)
+
+    d_z = np.asarray(test.cohen_d)
+    d_z_lower = lower / np.sqrt(n)
+    d_z_upper = upper / np.sqrt(n)
+
+    if sd_a is None or sd_b is None:
+        scale = np.nan
+    else:
+        sd_av = (np.asarray(sd_a, dtype=float)
+                 + np.asarray(sd_b, dtype=float)) / 2.
+        scale = test.sd_difference / sd_av
+
+    # r squared grows with |nc|, an interval spanning 0 starts at 0.
+    d_free = np.asarray(test.d_free, dtype=float)
+    r_lower = np.minimum(lower ** 2, upper ** 2)
+    r_lower = np.where((lower <= 0) & (upper >= 0), 0, r_lower)
+    r_upper = np.maximum(lower ** 2, upper ** 2)
+
+    # Indexing with () turns 0-d arrays into scalars.
+    return EffectSizes(
+                       d_z[()],
+                       d_z_lower[()],
+                       d_z_upper[()],
+                       (d_z * scale)[()],
+                       (d_z_lower * scale)[()],
+                       (d_z_upper * scale)[()],
+                       test.r_squared,
+                       (r_lower / (r_lower + d_free))[()],
+                       (r_upper / (r_upper + d_free))[()]
+                       )
+
+
+def paired_effect_sizes(data_a, data_b, confidence=0.95):
+    """Returns the effect sizes of data_a - data_b with exact
+    confidence intervals, see `effect_size_intervals`.
+
+    Pairs with a missing value are dropped.
+    """
+
+    a = np.asarray(data_a, dtype=float)
+    b = np.asarray(data_b, dtype=float)
+    keep = ~(np.isnan(a) | np.isnan(b))
+    a, b = a[keep], b[keep]
+
+    return effect_size_intervals(paired_test(a, b), a.std(ddof=1),
+                                 b.std(ddof=1), confidence)
@@ -0,0 +1,478 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    power
+    ~~~~~
+
+    This module provides power analysis and sample size estimates
+    for the paired (within subject) design of the Stroop experiment.
+
+    Analytic power uses the noncentral t distribution, simulated
+    power generates many synthetic studies as one array and tests
+    them in batch, spread over a process pool.
+"""
+from __future__ import print_function
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Largest number of values held in one simulated batch,
+# (studies x participants), keeps memory bounded.
+max_batch_values = 2 ** 22
+
+
+def _check_design(alpha=0.05, rho=0.0, shape=0.0):
+    """Raises ValueError for parameters outside their range."""
+
+    if not 0 < alpha < 1:
+        raise ValueError("alpha must be between 0 and 1, not {0!r}"
+                         .format(alpha))
+    if not -1 < rho < 1:
+        raise ValueError("rho must be between -1 and 1 (exclusive), "
+                         "not {0!r}".format(rho))
+    if not 0 <= shape <= 1:
+        raise ValueError("shape must be between 0 and 1, not {0!r}"
+                         .format(shape))
+
+
+def _critical_t(alpha, d_free, alternative):
+    """Returns the critical t value(s) for a test.
+
+    Parameters
+    ----------
+    alpha : float
+        Significance level.
+    d_free : array_like
+        Degrees of freedom.
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+    """
+
+    if alternative == 'two-sided':
+        return stats.t.ppf(1 - alpha / 2., d_free)
+    elif alternative in ('less', 'greater'):
+        return stats.t.ppf(1 - alpha, d_free)
+    raise ValueError(
+                     "alternative must be 'two-sided', 'less' or "
+                     "'greater', not {0!r}".format(alternative)
+                     )
+
+
+def analytic_power(effect_size, n, alpha=0.05, alternative='two-sided'):
+    """Returns the power of a paired t test.
+
+    Uses the noncentral t distribution with noncentrality
+    d_z * sqrt(n), where d_z is the mean difference divided by
+    the standard deviation of the difference.
+
+    Inputs broadcast against each other, so a grid of effect
+    sizes and sample sizes is computed in one call.
+
+    Parameters
+    ----------
+    effect_size : array_like
+        Standardised mean difference d_z. For 'less' the
+        effect is expected to be negative, as in the
+        Congruent - Incongruent difference.
+    n : array_like
+        Number of participants (pairs), at least 2.
+    alpha : float
+        Significance level.
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+
+    Returns
+    -------
+    power : ndarray
+        Probability of rejecting the null hypothesis.
+    """
+
+    effect_size = np.asarray(effect_size, dtype=float)
+    n = np.asarray(n, dtype=float)
+    if np.any(n < 2):
+        raise ValueError("n must be at least 2 for a paired t test")
+    _check_design(alpha)
+
+    d_free = n - 1
+    non_central = effect_size * np.sqrt(n)
+    t_crit = _critical_t(alpha, d_free, alternative)
+
+    # The lower tail uses the symmetry cdf(-t, nc) = sf(t, -nc),
+    # scipy's cdf returns nan far into the lower tail.
+    upper = stats.nct.sf(t_crit, d_free, non_central)
+    lower = stats.nct.sf(t_crit, d_free, -non_central)
+
+    if alternative == 'two-sided':
+        power = upper + lower
+    elif alternative == 'greater':
+        power = upper
+    else:
+        power = lower
+
+    return power
+
+
+def power_grid(effect_sizes, sample_sizes, alpha=0.05,
+               alternative='two-sided'):
+    """Returns a table of analytic power over a grid.
+
+    Parameters
+    ----------
+    effect_sizes : array_like
+        Effect sizes d_z, one row each.
+    sample_sizes : array_like
+        Numbers of participants, one column each.
+    alpha : float
+        Significance level.
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+
+    Returns
+    -------
+    grid : DataFrame
+        Power indexed by effect size with a column per
+        sample size.
+
+    See Also
+    --------
+    analytic_power : power of a single design
+    """
+
+    effect_sizes = np.asarray(effect_sizes, dtype=float)
+    sample_sizes = np.asarray(sample_sizes, dtype=int)
+
+    power = analytic_power(
+                           effect_sizes[:, np.newaxis],
+                           sample_sizes[np.newaxis, :],
+                           alpha=alpha,
+                           alternative=alternative
+                           )
+
+    grid = pd.DataFrame(power, index=effect_sizes, columns=sample_sizes)
+    grid.index.name = 'effect size'
+    grid.columns.name = 'n'
+    return grid
+
+
+def required_sample_size(effect_size, power=0.8, alpha=0.05,
+                         alternative='two-sided', n_max=10000):
+    """Returns the smallest n reaching the target power.
+
+    All candidate sample sizes from 2 to `n_max` are evaluated
+    at once for every effect size.
+
+    Parameters
+    ----------
+    effect_size : array_like
+        Effect sizes d_z.
+    power : float
+        Target power, e.g. 0.8.
+    alpha : float
+        Significance level.
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+    n_max : int
+        Largest sample size considered.
+
+    Returns
+    -------
+    n : ndarray
+        Required sample size for each effect size, -1 where
+        the target is not reached by `n_max`.
+    """
+
+    if not 0 < power < 1:
+        raise ValueError("power must be between 0 and 1, not {0!r}"
+                         .format(power))
+    if n_max < 2:
+        raise ValueError("n_max must be at least 2 for a paired t test")
+
+    effect_size = np.atleast_1d(np.asarray(effect_size, dtype=float))
+    candidates = np.arange(2, n_max + 1)
+
+    achieved = analytic_power(
+                              effect_size[:, np.newaxis],
+                              candidates[np.newaxis, :],
+                              alpha=alpha,
+                              alternative=alternative
+                              )
+    reached = achieved >= power
+
+    n = np.where(
+                 reached.any(axis=1),
+                 candidates[reached.argmax(axis=1)],
+                 -1
+                 )
+    return n
+
+
+def _standard_marginals(rng, shape, n_sims, n, rho, distribution):
+    """Returns two correlated draws with mean 0 and variance 1.
+
+    Parameters
+    ----------
+    rng : numpy Generator
+    shape : float
+        For 'exgauss' the share of variance from the exponential
+        tail, for 'clustered' the share from the cluster means.
+    n_sims : int
+        Number of synthetic studies.
+    n : int
+        Participants per study.
+    rho : float
+        Correlation of the normal component within a participant,
+        between -1 and 1.
+    distribution : string
+        'normal', 'exgauss' or 'clustered'.
+
+    Returns
+    -------
+    a, b : ndarray
+        Arrays of shape (n_sims, n).
+    cov : float
+        Covariance between `a` and `b`.
+    """
+
+    # A negative correlation shares the component with its sign
+    # flipped.
+    z_shared = rng.standard_normal((n_sims, n))
+    z_own = rng.standard_normal((2, n_sims, n))
+    z_a = np.sqrt(abs(rho)) * z_shared + np.sqrt(1 - abs(rho)) * z_own[0]
+    z_b = (np.sign(rho) * np.sqrt(abs(rho)) * z_shared
+           + np.sqrt(1 - abs(rho)) * z_own[1])
+
+    if distribution == 'normal':
+        return z_a, z_b, rho
+
+    if distribution == 'exgauss':
+        # Right skewed reaction times: normal plus an
+        # independent exponential tail, standardised.
+        tail = rng.standard_exponential((2, n_sims, n)) - 1
+        a = np.sqrt(1 - shape) * z_a + np.sqrt(shape) * tail[0]
+        b = np.sqrt(1 - shape) * z_b + np.sqrt(shape) * tail[1]
+        return a, b, (1 - shape) * rho
+
+    if distribution == 'clustered':
+        # Two clusters of participants within each condition,
+        # as seen in the Q-Q plots.
+        signs = rng.integers(0, 2, size=(2, n_sims, n)) * 2 - 1
+        a = np.sqrt(shape) * signs[0] + np.sqrt(1 - shape) * z_a
+        b = np.sqrt(shape) * signs[1] + np.sqrt(1 - shape) * z_b
+        return a, b, (1 - shape) * rho
+
+    raise ValueError(
+                     "distribution must be 'normal', 'exgauss' or "
+                     "'clustered', not {0!r}".format(distribution)
+                     )
+
+
+def simulate_differences(rng, effect_size, n, n_sims,
+                         distribution='normal', rho=0.5, shape=0.5):
+    """Returns paired differences for many synthetic studies.
+
+    The differences are scaled to unit population variance
+    before the effect is added, so `effect_size` is d_z.
+
+    Parameters
+    ----------
+    rng : numpy Generator
+        Source of random numbers.
+    effect_size : float
+        Population d_z.
+    n : int
+        Participants per study.
+    n_sims : int
+        Number of studies.
+    distribution : string
+        'normal', 'exgauss' or 'clustered'.
+    rho : float
+        Within participant correlation, between -1 and 1.
+    shape : float
+        Between 0 and 1, see `distribution`.
+
+    Returns
+    -------
+    diff : ndarray
+        Array of shape (n_sims, n).
+    """
+
+    _check_design(rho=rho, shape=shape)
+
+    a, b, cov = _standard_marginals(rng, shape, n_sims, n, rho,
+                                    distribution)
+    diff = a - b
+    diff /= np.sqrt(2 * (1 - cov))
+    diff += effect_size
+    return diff
+
+
+def batch_paired_test(diff, alternative='two-sided'):
+    """Returns t and p values for every row of differences.
+
+    Parameters
+    ----------
+    diff : ndarray
+        Array of shape (studies, participants).
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+
+    Returns
+    -------
+    t : ndarray
+    p : ndarray
+    """
+
+    n = diff.shape[-1]
+    d_free = n - 1
+    mean = diff.mean(axis=-1)
+    sem = diff.std(axis=-1, ddof=1) / np.sqrt(n)
+    t = mean / sem
+
+    if alternative == 'two-sided':
+        p = 2 * stats.t.sf(np.abs(t), d_free)
+    elif alternative == 'greater':
+        p = stats.t.sf(t, d_free)
+    elif alternative == 'less':
+        p = stats.t.cdf(t, d_free)
+    else:
+        raise ValueError(
+                         "alternative must be 'two-sided', 'less' or "
+                         "'greater', not {0!r}".format(alternative)
+                         )
+
+    return t, p
+
+
+def _simulate_rejections(job):
+    """Counts rejections for one batch, run in a worker process."""
+
+    (seed, effect_size, n, n_sims, distribution,
+     rho, shape, alpha, alternative) = job
+
+    rng = np.random.default_rng(seed)
+    rejected = 0
+    chunk = max(1, max_batch_values // n)
+    for start in range(0, n_sims, chunk):
+        size = min(chunk, n_sims - start)
+        diff = simulate_differences(rng, effect_size, n, size,
+                                    distribution, rho, shape)
+        t, p = batch_paired_test(diff, alternative)
+        rejected += int(np.count_nonzero(p < alpha))
+
+    return rejected
+
+
+def simulated_power_grid(effect_sizes, sample_sizes, n_sims=10000,
+                         distribution='normal', rho=0.5, shape=0.5,
+                         alpha=0.05, alternative='two-sided',
+                         seed=None, workers=None, jobs_per_cell=1):
+    """Returns a table of simulated power over a grid.
+
+    Each cell of the grid generates `n_sims` synthetic studies
+    and tests them as arrays, cells are spread over a process
+    pool.
+
+    Parameters
+    ----------
+    effect_sizes : array_like
+        Effect sizes d_z, one row each.
+    sample_sizes : array_like
+        Numbers of participants, one column each.
+    n_sims : int
+        Synthetic studies per cell.
+    distribution : string
+        'normal', 'exgauss' (right skewed) or 'clustered'
+        (two groups of participants per condition).
+    rho : float
+        Within participant correlation, between -1 and 1.
+    shape : float
+        Between 0 and 1. Share of variance from the exponential
+        tail ('exgauss') or the cluster means ('clustered').
+    alpha : float
+        Significance level.
+    alternative : string
+        'two-sided', 'less' or 'greater'.
+    seed : None/int
+        Seed for reproducible results.
+    workers : None/int
+        Number of processes, None uses all cores and 1 runs
+        in the current process.
+    jobs_per_cell : int
+        Splits each cell into this many jobs to balance
+        large grids over few cells.
+
+    Returns
+    -------
+    grid : DataFrame
+        Power indexed by effect size with a column per
+        sample size. The Monte Carlo standard error is at most
+        0.5 / sqrt(n_sims).
+
+    See Also
+    --------
+    power_grid : analytic power for normal differences
+    """
+
+    effect_sizes = np.asarray(effect_sizes, dtype=float)
+    sample_sizes = np.asarray(sample_sizes, dtype=int)
+    if np.any(sample_sizes < 2):
+        raise ValueError("n must be at least 2 for a paired t test")
+    if n_sims < 1:
+        raise ValueError("n_sims must be at least 1")
+    _check_design(alpha, rho, shape)
+
+    cells = [(e, n) for e in effect_sizes for n in sample_sizes]
+    seeds = np.random.SeedSequence(seed).spawn(len(cells) * jobs_per_cell)
+
+    jobs = []
+    for i, (effect_size, n) in enumerate(cells):
+        for j in range(jobs_per_cell):
+            size = (n_sims // jobs_per_cell
+                    + (1 if j < n_sims % jobs_per_cell else 0))
+            jobs.append((seeds[i * jobs_per_cell + j], effect_size, int(n),
+                         size, distribution, rho, shape, alpha,
+                         alternative))
+
+    if workers == 1:
+        rejected = [_simulate_rejections(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rejected = list(pool.map(_simulate_rejections, jobs))
+
+    rejected = np.asarray(rejected).reshape(len(cells), jobs_per_cell)
+    power = rejected.sum(axis=1) / float(n_sims)
+
+    grid = pd.DataFrame(
+                        power.reshape(len(effect_sizes), len(sample_sizes)),
+                        index=effect_sizes,
+                        columns=sample_sizes
+                        )
+    grid.index.name = 'effect size'
+    grid.columns.name = 'n'
+    return grid
+
+
+def simulate_power(effect_size, n, n_sims=10000, **kwargs):
+    """Returns the simulated power of a single design.
+
+    Parameters
+    ----------
+    effect_size : float
+        Population d_z.
+    n : int
+        Number of participants.
+    n_sims : int
+        Number of synthetic studies.
+    **kwargs
+        Passed to `simulated_power_grid`.
+
+    Returns
+    -------
+    power : float
+    """
+
+    kwargs.setdefault('jobs_per_cell', 1 if kwargs.get('workers') == 1
+                      else 8)
+    grid = simulated_power_grid([effect_size], [n], n_sims=n_sims, **kwargs)
+    return float(grid.iloc[0, 0])
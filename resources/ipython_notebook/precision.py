@@ -0,0 +1,194 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    precision
+    ~~~~~~~~~
+
+    This module supports the opt-in float32 mode of the statistics
+    behind `tables` and `figures`, halving the memory and bandwidth
+    of large in-memory analyses.
+
+    Reaction times need only millisecond resolution, which float32
+    holds with room to spare (about 7 significant digits). Values
+    are stored and scanned in float32, sums are accumulated
+    pairwise so their rounding error grows with log(n) rather than
+    n, and two pass moments with a correction term (as in
+    compensated summation) avoid cancellation in the variance.
+
+    Pass ``dtype='float32'`` to `descriptive.describe`,
+    `descriptive.statistics`, the `tables` functions,
+    `figures.batched_histograms`, `figures.univariate_grid` and
+    `paired.paired_test`. Differences from float64 stay within
+    `FLOAT32_TOLERANCES`, `check_float32` measures them on a sample.
+"""
+from __future__ import print_function
+import numpy as np
+import pandas as pd
+
+# Largest relative difference from float64, for data of up to
+# 10 ** 8 values with a coefficient of variation below 10.
+#
+# Quantiles, minimum, maximum and range select stored values, their
+# only error is the rounding of the inputs to float32 (2 ** -24).
+# Histogram counts can differ only for values within that rounding
+# of a bin edge.
+FLOAT32_TOLERANCES = {
+                      'count': 0.0,
+                      'mean': 1e-6,
+                      'median': 1e-7,
+                      'std': 1e-5,
+                      'iqr': 1e-6,
+                      'mad': 1e-5,
+                      'var': 2e-5,
+                      'range': 1e-6,
+                      'max': 1e-7,
+                      'min': 1e-7,
+                      'q95': 1e-7,
+                      'q90': 1e-7,
+                      'q75': 1e-7,
+                      'q50': 1e-7,
+                      'q25': 1e-7,
+                      'q10': 1e-7,
+                      'q05': 1e-7,
+                      't': 2e-5,
+                      'p': 1e-4
+                      }
+
+
+def working_dtype(dtype):
+    """Returns the numpy dtype of a compute mode.
+
+    Parameters
+    ----------
+    dtype : string/type/numpy dtype
+        float64 (the default everywhere) or float32.
+    """
+
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float64, np.float32):
+        raise ValueError(
+                         "dtype must be 'float64' or 'float32', not {0!r}"
+                         .format(str(dtype))
+                         )
+    return dtype
+
+
+def pairwise_sum(x, axis=0):
+    """Returns the sum along an axis with pairwise accumulation.
+
+    numpy sums pairwise only when the reduced axis is its inner
+    loop. Reducing axis 0 of a row major 2-D array instead adds
+    whole rows one at a time, an error growing with n that float32
+    cannot afford. Each column is summed on its own here, as a 1-D
+    (pairwise) sum, which is also the faster order. float64 input
+    is summed by numpy directly.
+
+    Parameters
+    ----------
+    x : ndarray
+    axis : int
+
+    Returns
+    -------
+    total : ndarray
+        Same dtype as `x`.
+    """
+
+    x = np.asarray(x)
+    if x.dtype != np.float32:
+        return x.sum(axis=axis)
+
+    x = np.moveaxis(x, axis, 0)
+    shape = x.shape[1:]
+    columns = x.reshape(x.shape[0], int(np.prod(shape)))
+    total = np.array([columns[:, j].sum() for j in range(columns.shape[1])],
+                     dtype=x.dtype)
+    return total.reshape(shape)
+
+
+def moments(x, ddof=1):
+    """Returns the count, mean and variance of each column.
+
+    Missing values are ignored. Two passes, the second sums
+    squared deviations from the first pass mean.
+
+    Parameters
+    ----------
+    x : ndarray
+        1-D or 2-D, float32 or float64.
+    ddof : int
+        Delta degrees of freedom of the variance.
+
+    Returns
+    -------
+    n, mean, var : ndarray
+        float64 arrays, one value per column.
+    """
+
+    present = ~np.isnan(x)
+    n = present.sum(axis=0)
+    zero = x.dtype.type(0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = pairwise_sum(np.where(present, x, zero)) / n
+        deviation = np.where(present, x - mean.astype(x.dtype), zero)
+        # Correction for the rounding of the first pass mean.
+        correction = pairwise_sum(deviation).astype(float)
+        mean = mean.astype(float) + correction / n
+        squares = pairwise_sum(deviation * deviation).astype(float)
+        var = (squares - correction ** 2 / n) / (n - ddof)
+
+    return n, mean, var
+
+
+def check_float32(data, pairs=()):
+    """Returns the relative differences of float32 mode from
+    float64 for every table statistic and paired test.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Columns to describe.
+    pairs : list
+        Pairs of column names (a, b) for paired tests of a - b.
+
+    Returns
+    -------
+    report : DataFrame
+        One row per statistic with the largest relative
+        difference over the columns, the tolerance and whether
+        it was met.
+    """
+
+    from descriptive import statistics
+    from paired import paired_test
+
+    rows = {}
+    exact = statistics(data)
+    reduced = statistics(data, dtype='float32')
+    for key in exact:
+        rows[key] = _relative(exact[key], reduced[key])
+
+    for a, b in pairs:
+        exact = paired_test(data[a], data[b])
+        reduced = paired_test(data[a], data[b], dtype='float32')
+        for key in ('t', 'p'):
+            rows[key] = max(rows.get(key, 0.0),
+                            _relative(getattr(exact, key),
+                                      getattr(reduced, key)))
+
+    report = pd.DataFrame({'relative_difference': pd.Series(rows)})
+    report['tolerance'] = [FLOAT32_TOLERANCES[key] for key in report.index]
+    report['within'] = report.relative_difference <= report.tolerance
+    return report
+
+
+def _relative(exact, reduced):
+    """Largest relative difference, 0 where both are 0 or NaN."""
+
+    exact = np.asarray(exact, dtype=float)
+    reduced = np.asarray(reduced, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        diff = np.abs(reduced - exact) / np.abs(exact)
+    diff = np.where(reduced == exact, 0.0, diff)
+    return float(np.nanmax(diff)) if diff.size else 0.0
@@ -0,0 +1,242 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    renderers
+    ~~~~~~~~~
+
+    This module renders a `descriptive.Summary` as plain text, HTML,
+    LaTeX, JSON or a numpy record array.
+
+    Only the standard library and numpy are used, for consumers
+    that need the numbers rather than a plotted table.
+"""
+from __future__ import print_function
+from html import escape as _html_escape
+import json
+import numpy as np
+
+
+def _format(value, f):
+    """Returns a value as a string rounded to `f` places."""
+
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    if isinstance(value, (int, np.integer)):
+        return '{0:d}'.format(int(value))
+    return '{0:.{1}f}'.format(float(value), f)
+
+
+def _rows(summary, f):
+    """Yields (section title, label, tex, formatted values)."""
+
+    for sec in summary.sections:
+        for stat in sec.statistics:
+            cells = [_format(v, f) for v in stat.values.tolist()]
+            yield sec.title, stat.label, stat.tex, cells
+
+
+def to_text(summary, f=2):
+    """Returns the summary as an aligned plain text table.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+    f : int
+        Interger to set the rounding position.
+
+    Returns
+    -------
+    text : string
+    """
+
+    rows = list(_rows(summary, f))
+    label_width = max([len(r[1]) for r in rows] + [0])
+    widths = [len(c) for c in summary.columns]
+    for row in rows:
+        widths = [max(w, len(c)) for w, c in zip(widths, row[3])]
+
+    def line(label, cells):
+        return '  '.join([label.ljust(label_width)]
+                         + [c.rjust(w) for c, w in zip(cells, widths)])
+
+    out = [line('', summary.columns)]
+    title = None
+    for sec_title, label, tex, cells in rows:
+        if sec_title != title:
+            title = sec_title
+            out.append('')
+            out.append(title)
+            out.append('-' * len(title))
+        out.append(line(label, cells))
+
+    return '\n'.join(out) + '\n'
+
+
+def to_html(summary, f=2, table_class='descriptive-statistics'):
+    """Returns the summary as an HTML table.
+
+    Each section is a `tbody` headed by its title.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+    f : int
+        Interger to set the rounding position.
+    table_class : string
+        CSS class of the table element.
+
+    Returns
+    -------
+    html : string
+    """
+
+    span = len(summary.columns) + 1
+    out = ['<table class="{0}">'.format(_html_escape(table_class)),
+           '<thead><tr><th></th>'
+           + ''.join('<th>{0}</th>'.format(_html_escape(c))
+                     for c in summary.columns)
+           + '</tr></thead>']
+
+    title = None
+    for sec_title, label, tex, cells in _rows(summary, f):
+        if sec_title != title:
+            if title is not None:
+                out.append('</tbody>')
+            title = sec_title
+            out.append('<tbody><tr><th colspan="{0}">{1}</th></tr>'
+                       .format(span, _html_escape(title)))
+        out.append('<tr><td>{0}</td>'.format(_html_escape(label))
+                   + ''.join('<td>{0}</td>'.format(c) for c in cells)
+                   + '</tr>')
+    if title is not None:
+        out.append('</tbody>')
+    out.append('</table>')
+
+    return '\n'.join(out) + '\n'
+
+
+def _latex_escape(text):
+    """Escapes LaTeX special characters in plain text."""
+
+    for char in ('\\', '&', '%', '$', '#', '_', '{', '}'):
+        text = text.replace(char, '\\' + char)
+    return text
+
+
+def to_latex(summary, f=2):
+    """Returns the summary as a LaTeX tabular.
+
+    Statistic labels use the same tex symbols as the
+    plotted tables.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+    f : int
+        Interger to set the rounding position.
+
+    Returns
+    -------
+    latex : string
+    """
+
+    span = len(summary.columns) + 1
+    out = [r'\begin{tabular}{l' + 'r' * len(summary.columns) + '}',
+           r'\hline',
+           ' & '.join([''] + [_latex_escape(c) for c in summary.columns])
+           + r' \\']
+
+    title = None
+    for sec_title, label, tex, cells in _rows(summary, f):
+        if sec_title != title:
+            title = sec_title
+            out.append(r'\hline')
+            out.append(r'\multicolumn{{{0}}}{{l}}{{\textbf{{{1}}}}} \\'
+                       .format(span, _latex_escape(title)))
+        out.append(' & '.join([tex] + cells) + r' \\')
+    out.append(r'\hline')
+    out.append(r'\end{tabular}')
+
+    return '\n'.join(out) + '\n'
+
+
+def to_dict(summary, f=None):
+    """Returns the summary as nested JSON compatible objects.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+    f : None/int
+        Rounding position, None keeps full precision.
+
+    Returns
+    -------
+    data : dict
+        Columns and a list of sections, missing values are None.
+    """
+
+    def clean(value):
+        if isinstance(value, float) and np.isnan(value):
+            return None
+        if f is not None and isinstance(value, float):
+            return round(value, f)
+        return value
+
+    sections = []
+    for sec in summary.sections:
+        sections.append({
+                         'title': sec.title,
+                         'statistics': [
+                                        {'key': stat.key,
+                                         'label': stat.label,
+                                         'values': [clean(v) for v in
+                                                    stat.values.tolist()]}
+                                        for stat in sec.statistics
+                                        ]
+                         })
+
+    return {'columns': list(summary.columns), 'sections': sections}
+
+
+def to_json(summary, f=None, **kwargs):
+    """Returns the summary as a JSON string.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+    f : None/int
+        Rounding position, None keeps full precision.
+    **kwargs
+        Passed to `json.dumps`, e.g. indent.
+
+    Returns
+    -------
+    text : string
+    """
+
+    return json.dumps(to_dict(summary, f), **kwargs)
+
+
+def to_records(summary):
+    """Returns the summary as a numpy record array.
+
+    One record per statistic with its section, key, label and a
+    float field per column.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+
+    Returns
+    -------
+    records : numpy recarray
+    """
+
+    rows = [(sec.title, stat.key, stat.label)
+            + tuple(float(v) for v in stat.values.tolist())
+            for sec in summary.sections for stat in sec.statistics]
+
+    dtype = ([('section', 'U16'), ('key', 'U8'), ('label', 'U16')]
+             + [(str(c), 'f8') for c in summary.columns])
+
+    return np.rec.array(rows, dtype=dtype)
@@ -0,0 +1,322 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    rendering
+    ~~~~~~~~~
+
+    This module provides an object oriented rendering path that does
+    not touch pyplot or seaborn global state, so figures can be drawn
+    concurrently in a thread pool.
+
+    Every figure is a `matplotlib.figure.Figure` with its own Agg
+    canvas, and the style is passed in as a `Style` rather than set
+    globally. Figures are not registered with pyplot and are freed
+    once no longer referenced.
+"""
+from __future__ import print_function
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from scipy import stats
+
+from descriptive import describe
+from theoretical import distribution_name, probplot
+
+Style = namedtuple('Style', [
+                             'font_family',
+                             'title_size',
+                             'label_size',
+                             'tick_size',
+                             'title_color',
+                             'font_colour',
+                             'tick_color',
+                             'grid_color',
+                             'color_set'
+                             ])
+
+# Equivalent of `figures.common_set_up`, the seaborn poster context
+# at font scale 0.8 with ticks and a very faint grid.
+DEFAULT_STYLE = Style(
+                      font_family=['Gill Sans MT', 'DejaVu Sans'],
+                      title_size=20,
+                      label_size=16,
+                      tick_size=14,
+                      title_color='#192231',  # Dark grey
+                      font_colour='#9099A2',  # Light grey
+                      tick_color='0.4',
+                      grid_color='0.99',
+                      color_set=['#192231', '#3C3C3C', '#CDCDCD', '#494E6B']
+                      )
+
+
+def new_figure(fig_size, dpi=100):
+    """Returns a Figure attached to its own Agg canvas.
+
+    Parameters
+    ----------
+    fig_size : tuple
+        Width and height in inches.
+    dpi : int
+        Resolution used when saving.
+    """
+
+    fig = Figure(figsize=fig_size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def style_axes(ax, style=DEFAULT_STYLE, grid=True):
+    """Applies a style to one axes, the seaborn 'ticks' look.
+
+    Parameters
+    ----------
+    ax : matplotlib axes
+    style : Style
+    grid : boolean
+        True draws the faint grid.
+    """
+
+    ax.set_facecolor('white')
+    ax.grid(grid, color=style.grid_color)
+    ax.tick_params(
+                   colors=style.tick_color,
+                   labelsize=style.tick_size,
+                   labelfontfamily=style.font_family,
+                   direction='out'
+                   )
+    # Despined on every side, as in `figures`.
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    return ax
+
+
+def _labels(ax, title, x_label, y_label, style):
+    """Sets the title and axis labels with the style fonts."""
+
+    if title:
+        ax.set_title(title, fontsize=style.title_size,
+                     color=style.title_color, fontfamily=style.font_family)
+    ax.set_xlabel(x_label, fontsize=style.label_size,
+                  color=style.font_colour, fontfamily=style.font_family)
+    ax.set_ylabel(y_label, fontsize=style.label_size,
+                  color=style.font_colour, fontfamily=style.font_family)
+
+
+def histogram_figure(x, name, bins=10, style=DEFAULT_STYLE, fig_size=(12, 6),
+                     kde=True, rug=True, x_lower=None, x_upper=None,
+                     dpi=100):
+    """Returns a histogram figure like `figures.univariate`.
+
+    Parameters
+    ----------
+    x : array_like
+        Values, missing values are ignored.
+    name : string
+        Name of the variable, include units.
+    bins : int
+        Number of bins.
+    style : Style
+    fig_size : tuple
+        Width and height in inches.
+    kde : boolean
+        True draws a kernel density estimate scaled to counts.
+    rug : boolean
+        True draws a tick per value along the x axis.
+    x_lower, x_upper : None/int/float
+        Limits of the x axis, None sets them automatically.
+    dpi : int
+
+    Returns
+    -------
+    fig : matplotlib Figure
+    """
+
+    x = np.asarray(x, dtype=float)
+    x = x[~np.isnan(x)]
+
+    fig = new_figure(fig_size, dpi)
+    ax = style_axes(fig.add_subplot(111), style)
+    colors = style.color_set
+
+    value_range = None
+    if x_lower is not None and x_upper is not None:
+        value_range = (x_lower, x_upper)
+    counts, edges = np.histogram(x, bins=bins, range=value_range)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+           color=colors[2], edgecolor='white', linewidth=1,
+           label='Histogram')
+
+    if kde and x.size > 1:
+        grid = np.linspace(edges[0], edges[-1], 200)
+        density = stats.gaussian_kde(x)(grid)
+        ax.plot(grid, density * x.size * np.diff(edges).mean(),
+                color=colors[0], lw=3, label='KDE')
+
+    if rug:
+        ax.plot(x, np.zeros_like(x), '|', color=colors[1], alpha=0.5,
+                markersize=10, transform=ax.get_xaxis_transform())
+
+    if x_lower is not None or x_upper is not None:
+        ax.set_xlim(x_lower, x_upper)
+
+    title = 'Distribution of {0}'.format(name)
+    if rug:
+        title += ', with rug plot'
+    _labels(ax, title, name, 'Frequency', style)
+    ax.legend(frameon=False, labelcolor=style.font_colour)
+
+    return fig
+
+
+def qq_figure(data, name, distribution='norm', style=DEFAULT_STYLE,
+              fig_size=(7, 7), dpi=100):
+    """Returns a Q-Q plot figure like `figures.qq_plot`.
+
+    Parameters
+    ----------
+    data : array_like
+        Values to compare with the distribution.
+    name : string
+        String describing the input data.
+    distribution : string/scipy distribution
+        Accepted by scipy.stats.probplot.
+    style : Style
+    fig_size : tuple
+        Width and height in inches.
+    dpi : int
+
+    Returns
+    -------
+    fig : matplotlib Figure
+    """
+
+    fig = new_figure(fig_size, dpi)
+    ax = style_axes(fig.add_subplot(111), style)
+
+    (x, y) = probplot(data, distribution)
+    slope, intercept, r, prob, sterrest = stats.linregress(x, y)
+
+    ax.plot(x, slope * x + intercept, style.font_colour,
+            linestyle='--', linewidth=1)
+    ax.scatter(x, y, s=70, facecolors='none',
+               edgecolors=style.color_set[0], linewidths=1.4)
+
+    dist_name = distribution_name(distribution)
+    _labels(ax, 'Q-Q plot of {0}'.format(name),
+            'Quantiles of {0} dist.'.format(dist_name),
+            'Quantiles of {0}'.format(name), style)
+
+    return fig
+
+
+def table_figure(data, column_name=None, style=DEFAULT_STYLE,
+                 fig_size=(8, 8), f=2, dpi=100, dtype='float64'):
+    """Returns a descriptive statistics figure like
+    `tables.descriptive_table`.
+
+    Parameters
+    ----------
+    data : DataFrame/descriptive.Summary
+        Data to describe, or an already computed summary.
+    column_name : None/list
+        Column names, None uses the DataFrame headers.
+    style : Style
+    fig_size : tuple
+        Width and height in inches.
+    f : int
+        Interger to set the rounding position.
+    dpi : int
+    dtype : string
+        'float64' or 'float32', see `descriptive.statistics`.
+
+    Returns
+    -------
+    fig : matplotlib Figure
+    """
+
+    if hasattr(data, 'sections'):
+        summary = data
+    else:
+        summary = describe(data, column_name, dtype)
+
+    fig = new_figure(fig_size, dpi)
+    heights = [len(sec.statistics) + (1 if i == 0 else 0)
+               for i, sec in enumerate(summary.sections)]
+    grid = fig.add_gridspec(len(heights), 1, height_ratios=heights)
+
+    for i, sec in enumerate(summary.sections):
+        ax = fig.add_subplot(grid[i])
+        ax.set_axis_off()
+        cells = [[stat.tex] + [round(v, f if stat.key != 'count' else 0)
+                               for v in stat.values.tolist()]
+                 for stat in sec.statistics]
+        table = ax.table(
+                         cellText=cells,
+                         colLabels=[''] + summary.columns if i == 0 else None,
+                         loc='center',
+                         cellLoc='center',
+                         bbox=(0, 0, 1, 1),
+                         edges=''
+                         )
+        for cell in table.get_celld().values():
+            cell.get_text().set_fontsize(15)
+            cell.get_text().set_color(style.title_color)
+            cell.get_text().set_fontfamily(style.font_family)
+        if i > 0:
+            ax.set_title(sec.title, fontsize=12, color=style.font_colour,
+                         fontfamily=style.font_family)
+
+    fig.suptitle('Descriptive Statistics', fontsize=16,
+                 color=style.font_colour, x=0.25,
+                 fontfamily=style.font_family)
+    fig.subplots_adjust(hspace=0.3, top=0.95)
+
+    return fig
+
+
+def render_to_file(fname, renderer, *args, **kwargs):
+    """Draws a figure with `renderer` and saves it.
+
+    Parameters
+    ----------
+    fname : string or file-like
+        Output, the format follows the file extension.
+    renderer : callable
+        Returns a Figure, e.g. `qq_figure`.
+    *args, **kwargs
+        Passed to `renderer`.
+
+    Returns
+    -------
+    fname : string or file-like
+    """
+
+    fig = renderer(*args, **kwargs)
+    fig.savefig(fname)
+    return fname
+
+
+def render_many(jobs, workers=None):
+    """Renders and saves many figures in a thread pool.
+
+    Parameters
+    ----------
+    jobs : iterable
+        Tuples (fname, renderer, args, kwargs), see
+        `render_to_file`.
+    workers : None/int
+        Number of threads, None uses the executor default.
+
+    Returns
+    -------
+    fnames : list
+        Outputs in the order of `jobs`.
+    """
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_to_file, fname, renderer,
+                               *args, **kwargs)
+                   for fname, renderer, args, kwargs in jobs]
+        return [future.result() for future in futures]
@@ -0,0 +1,502 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    renderserver
+    ~~~~~~~~~~~~
+
+    This module keeps warm render worker processes behind a local
+    socket, so small on demand reports do not pay for importing
+    matplotlib, seaborn and scipy, building the font cache and
+    resolving fonts before every first figure.
+
+    Workers import `rendering` and draw a throw away figure when
+    they start. Jobs name a dataset and a figure spec, datasets are
+    cached per worker. At most `max_pending` jobs are queued or
+    running, further requests are refused with a busy reply that
+    `RenderClient` backs off from and retries.
+
+    Messages are pickles, so every connection must present the
+    server's authkey (one is generated when none is given) and
+    only loopback addresses are served without an explicit key.
+    Jobs read and write files below the server's `root` only.
+
+    Example::
+
+        server = RenderServer(workers=4).start()
+
+        client = RenderClient(server.address, authkey=server.authkey)
+        client.render('stroopdata.csv', 'qq', 'qq.png',
+                      column='Congruent')
+
+    or from a shell, ``python renderserver.py --port 6000``.
+"""
+from __future__ import print_function
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (Client, Listener, answer_challenge,
+                                        deliver_challenge)
+import os
+import secrets
+import socket
+import struct
+import threading
+import time
+
+# Figure spec names and the `rendering` function drawing them.
+RENDERERS = {
+             'histogram': 'histogram_figure',
+             'qq': 'qq_figure',
+             'table': 'table_figure'
+             }
+
+# Datasets kept in memory by each worker.
+DATASET_CACHE_SIZE = 8
+
+# Hosts served without an explicit authkey.
+LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+# Bytes of a generated authkey.
+AUTHKEY_SIZE = 32
+
+# Seconds a new connection has to authenticate.
+AUTH_TIMEOUT = 5.0
+
+# Connections waiting to be accepted.
+LISTEN_BACKLOG = 128
+
+_datasets = OrderedDict()
+
+
+class ServerBusy(RuntimeError):
+    """Raised when the server refuses a job, `max_pending` jobs
+    are already queued or running."""
+
+
+def _warm_worker():
+    """Loads the plotting stack in a new worker process.
+
+    Drawing one figure with text builds the font cache and
+    resolves the style fonts once per process.
+    """
+
+    import rendering
+
+    fig = rendering.histogram_figure([0.0, 1.0, 2.0], 'warm up', bins=2)
+    fig.canvas.draw()
+
+
+def _ready():
+    """Returns the worker pid, used to start every worker."""
+
+    return os.getpid()
+
+
+def _resolve(root, path):
+    """Returns a path below `root`, ValueError for any other."""
+
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([full, root]) != root:
+        raise ValueError(
+                         "path must be below {0!r}, not {1!r}"
+                         .format(root, path)
+                         )
+    return full
+
+
+def _set_timeout(conn, seconds):
+    """Sets the receive timeout of a connection's socket, 0 for
+    none.
+
+    A socket level timeout keeps the descriptor blocking, as
+    `multiprocessing.connection.Connection` expects.
+    """
+
+    timeval = struct.pack('ll', int(seconds), int(seconds % 1 * 10 ** 6))
+    with socket.socket(fileno=os.dup(conn.fileno())) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+
+
+def _load(path):
+    """Returns a dataset, cached until the file changes.
+
+    .npy files load memory mapped, anything else is read as CSV.
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key in _datasets:
+        _datasets.move_to_end(key)
+        return _datasets[key]
+
+    if path.endswith('.npy'):
+        data = np.load(path, mmap_mode='r')
+        if data.dtype.names is None:
+            data = pd.DataFrame(data)
+        else:
+            data = pd.DataFrame.from_records(data)
+    else:
+        data = pd.read_csv(path, sep=',')
+
+    _datasets[key] = data
+    while len(_datasets) > DATASET_CACHE_SIZE:
+        _datasets.popitem(last=False)
+    return data
+
+
+def render_job(spec):
+    """Renders and saves one figure, run in a worker.
+
+    Parameters
+    ----------
+    spec : dict
+        'data' path of a CSV or .npy file, 'figure' one of
+        `RENDERERS`, 'output' file to save, 'column' the column
+        drawn by 'histogram' and 'qq', optional 'columns' for
+        'table' (None uses every column) and 'kwargs' passed to
+        the `rendering` function.
+
+    Returns
+    -------
+    output : string
+    """
+
+    import rendering
+
+    figure = spec['figure']
+    if figure not in RENDERERS:
+        raise ValueError(
+                         "figure must be one of {0}, not {1!r}"
+                         .format(sorted(RENDERERS), figure)
+                         )
+    renderer = getattr(rendering, RENDERERS[figure])
+    data = _load(spec['data'])
+
+    if figure == 'table':
+        columns = spec.get('columns')
+        args = (data if columns is None else data[list(columns)],)
+    else:
+        column = spec['column']
+        args = (data[column], str(column))
+
+    return rendering.render_to_file(spec['output'], renderer, *args,
+                                    **spec.get('kwargs', {}))
+
+
+class RenderServer(object):
+    """Serves render jobs from warm worker processes.
+
+    Each client connection is handled in a thread and sends job
+    specs (see `render_job`) one at a time. The reply is
+    ``('ok', output)``, ``('error', message)`` or ``('busy',
+    pending)`` when `max_pending` jobs are already in flight.
+
+    Parameters
+    ----------
+    address : tuple/string
+        (host, port) to listen on, port 0 picks a free port.
+        A string is a Unix socket path. Hosts other than
+        `LOOPBACK_HOSTS` need an explicit `authkey`.
+    authkey : None/bytes
+        Shared secret clients must present, None generates a
+        random one, see `authkey` below.
+    root : None/string
+        Directory the data and output paths of jobs are resolved
+        in, paths outside it are refused. None uses the current
+        directory.
+    workers : int
+        Number of render processes, started at once.
+    max_pending : None/int
+        Largest number of jobs queued or running, None uses
+        twice the number of workers.
+
+    Attributes
+    ----------
+    authkey : bytes
+        Shared secret to pass to `RenderClient`.
+    completed : int
+        Number of jobs rendered.
+    failed : int
+        Number of jobs that raised an error.
+    refused : int
+        Number of jobs refused as busy.
+    """
+
+    def __init__(self, address=('localhost', 0), authkey=None, root=None,
+                 workers=2, max_pending=None):
+        if (authkey is None and not isinstance(address, str)
+                and address[0] not in LOOPBACK_HOSTS):
+            raise ValueError(
+                             "an authkey is required to listen on {0!r}"
+                             .format(address[0])
+                             )
+        self.authkey = authkey or secrets.token_bytes(AUTHKEY_SIZE)
+        self.root = os.path.realpath(root or os.getcwd())
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+        self._requested_address = address
+        self._closing = False
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._listener = None
+        self._thread = None
+        self.completed = 0
+        self.failed = 0
+        self.refused = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def address(self):
+        """Address clients connect to."""
+        return self._listener.address
+
+    def start(self):
+        """Starts and warms the workers, then accepts clients in a
+        background thread.
+
+        Returns
+        -------
+        server : RenderServer
+        """
+
+        # Workers are started before any server thread exists.
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         initializer=_warm_worker)
+        ready = [self._pool.submit(_ready) for i in range(self.workers)]
+        for future in ready:
+            future.result()
+
+        # Connections authenticate in their own thread, so a
+        # client that never answers does not hold up the others.
+        self._listener = Listener(self._requested_address,
+                                  backlog=LISTEN_BACKLOG)
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Blocks until the server is closed."""
+
+        while self._thread is not None and self._thread.is_alive():
+            self._thread.join(0.5)
+
+    def _accept(self):
+        """Hands every new connection to its own thread, until
+        `close` wakes it with a last connection."""
+
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closing:
+                    return
+                continue  # Connection reset before it was accepted
+            if self._closing:
+                conn.close()
+                self._listener.close()
+                return
+            threading.Thread(target=self._handle, args=(conn,),
+                             daemon=True).start()
+
+    def _authenticate(self, conn):
+        """Returns True when the client proves it holds the authkey
+        within `AUTH_TIMEOUT` seconds."""
+
+        try:
+            _set_timeout(conn, AUTH_TIMEOUT)
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+            _set_timeout(conn, 0)
+        except (AuthenticationError, EOFError, OSError):
+            return False
+        return True
+
+    def _handle(self, conn):
+        """Authenticates one connection, then answers its jobs until
+        it closes."""
+
+        with conn:
+            if not self._authenticate(conn):
+                return
+            while True:
+                try:
+                    spec = conn.recv()
+                except (EOFError, OSError):
+                    return
+                conn.send(self._submit(spec))
+
+    def _submit(self, spec):
+        """Runs one job if a slot is free, returns the reply."""
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.refused += 1
+            return ('busy', self.max_pending)
+
+        try:
+            spec = dict(spec)
+            spec['data'] = _resolve(self.root, spec['data'])
+            spec['output'] = _resolve(self.root, spec['output'])
+            output = self._pool.submit(render_job, spec).result()
+        except Exception as error:
+            with self._lock:
+                self.failed += 1
+            return ('error', '{0}: {1}'.format(type(error).__name__, error))
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            self.completed += 1
+        return ('ok', output)
+
+    def close(self):
+        """Stops accepting clients and shuts the workers down.
+
+        Closing a listener does not interrupt a blocked accept, so
+        the accept thread is woken by one last connection.
+        """
+
+        if self._thread is not None and self._thread.is_alive():
+            self._closing = True
+            try:
+                Client(self.address).close()
+            except OSError:
+                pass
+            self._thread.join()
+        elif self._listener is not None:
+            self._listener.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self._listener = None
+        self._pool = None
+        self._thread = None
+
+
+class RenderClient(object):
+    """Sends render jobs to a `RenderServer`.
+
+    Parameters
+    ----------
+    address : tuple/string
+        `RenderServer.address`.
+    authkey : None/bytes
+        Shared secret of the server, `RenderServer.authkey`.
+    retries : int
+        Times a busy reply is retried before `ServerBusy` is
+        raised.
+    backoff : float
+        Seconds before the first retry, doubled after each.
+    """
+
+    def __init__(self, address, authkey=None, retries=5, backoff=0.05):
+        self.retries = retries
+        self.backoff = backoff
+        self._conn = Client(address, authkey=authkey)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def render(self, data, figure, output, column=None, columns=None,
+               **kwargs):
+        """Renders one figure on the server and waits for it.
+
+        Parameters
+        ----------
+        data : string
+            Path of a CSV or .npy file, relative to the server's
+            `root`.
+        figure : string
+            One of `RENDERERS`.
+        output : string
+            File the server saves the figure to, relative to its
+            `root`.
+        column : None/string
+            Column drawn by 'histogram' and 'qq'.
+        columns : None/list
+            Columns of a 'table', None uses all.
+        **kwargs
+            Passed to the `rendering` function.
+
+        Returns
+        -------
+        output : string
+        """
+
+        spec = {
+                'data': data,
+                'figure': figure,
+                'output': output,
+                'column': column,
+                'columns': columns,
+                'kwargs': kwargs
+                }
+
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            self._conn.send(spec)
+            status, value = self._conn.recv()
+            if status != 'busy':
+                break
+            time.sleep(delay)
+            delay *= 2
+
+        if status == 'busy':
+            raise ServerBusy(
+                             "server busy, {0} jobs in flight"
+                             .format(value)
+                             )
+        if status == 'error':
+            raise RuntimeError(value)
+        return value
+
+    def close(self):
+        """Closes the connection."""
+        self._conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+                                     description='Serves render jobs from '
+                                                 'warm workers.'
+                                     )
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6000)
+    parser.add_argument('--root', default=None,
+                        help='directory of the data and output files')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=None)
+    args = parser.parse_args()
+
+    # Hosts other than LOOPBACK_HOSTS need RENDER_AUTHKEY.
+    authkey = os.environ.get('RENDER_AUTHKEY')
+    try:
+        server = RenderServer(
+                              (args.host, args.port),
+                              authkey=authkey.encode() if authkey else None,
+                              root=args.root,
+                              workers=args.workers,
+                              max_pending=args.max_pending
+                              )
+    except ValueError as error:
+        parser.error('{0}, set RENDER_AUTHKEY'.format(error))
+    with server:
+        print('Serving on {0}:{1}'.format(*server.address))
+        if not authkey:
+            print('authkey {0}'.format(server.authkey.hex()))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
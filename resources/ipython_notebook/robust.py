@@ -0,0 +1,291 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    robust
+    ~~~~~~
+
+    This module provides numpy robust statistics computed column
+    wise on 2-D arrays, used to build the dispersion and
+    distribution tables.
+
+    Order statistics use linear time selection (`np.partition`)
+    rather than sorting. Missing values (NaN) and values flagged
+    in an optional `mask` (True means excluded) are ignored.
+
+    float32 input is kept in float32 (see `precision`), other input
+    is converted to float64.
+"""
+from __future__ import print_function
+import numpy as np
+
+from precision import pairwise_sum
+
+# Scale turning the median absolute deviation into a consistent
+# estimate of the standard deviation of normal data.
+MAD_NORMAL_SCALE = 1.482602218505602
+
+# Scale turning the IQR into the same, 2 * Phi^-1(0.75).
+IQR_NORMAL_SCALE = 1.3489795003921634
+
+
+def _prepare(x, mask):
+    """Returns 2-D data with excluded values as +inf, and counts.
+
+    Parameters
+    ----------
+    x : array_like
+        1-D or 2-D data, columns are variables.
+    mask : None/array_like
+        Boolean array of the same shape, True excludes a value.
+
+    Returns
+    -------
+    filled : ndarray
+        2-D float32 or float64 array, excluded values sort to
+        the end.
+    excluded : ndarray
+        2-D boolean array, True for missing or masked values.
+    n : ndarray
+        Number of included values per column.
+    one_d : boolean
+        True when the input had a single column.
+    """
+
+    x = np.asarray(x)
+    if x.dtype != np.float32:
+        x = x.astype(float)
+    one_d = x.ndim == 1
+    if one_d:
+        x = x[:, np.newaxis]
+    if x.ndim != 2:
+        raise ValueError("x must be 1-D or 2-D, not {0}-D".format(x.ndim))
+
+    excluded = np.isnan(x)
+    if mask is not None:
+        # A 1-D mask flags whole rows.
+        mask = np.asarray(mask, dtype=bool)
+        if mask.ndim == 1:
+            mask = mask[:, np.newaxis]
+        excluded |= np.broadcast_to(mask, x.shape)
+
+    filled = np.where(excluded, x.dtype.type(np.inf), x)
+    n = (~excluded).sum(axis=0)
+    return filled, excluded, n, one_d
+
+
+def _finish(result, one_d):
+    """Returns a scalar row for 1-D input."""
+
+    if one_d:
+        return result[..., 0]
+    return result
+
+
+def _select(filled, positions):
+    """Returns the order statistics at `positions` per column.
+
+    Parameters
+    ----------
+    filled : ndarray
+        2-D data from `_prepare`.
+    positions : ndarray
+        Integer array (k, columns) of 0 based ranks.
+
+    Returns
+    -------
+    values : ndarray
+        Array (k, columns), one partition call for all ranks.
+    """
+
+    if filled.shape[0] == 0:
+        # No rows, the callers set empty columns to NaN.
+        return np.full(positions.shape, np.nan, dtype=filled.dtype), filled
+
+    kth = np.unique(positions)
+    part = np.partition(filled, kth, axis=0)
+    return np.take_along_axis(part, positions, axis=0), part
+
+
+def quantiles(x, q, mask=None):
+    """Returns quantiles with linear interpolation.
+
+    Matches numpy.percentile and pandas quantile defaults.
+
+    Parameters
+    ----------
+    x : array_like
+        1-D or 2-D data, columns are variables.
+    q : float/array_like
+        Probabilities between 0 and 1.
+    mask : None/array_like
+        True excludes a value.
+
+    Returns
+    -------
+    values : ndarray
+        Shape (len(q), columns), leading or trailing axes are
+        dropped for scalar `q` or 1-D `x`.
+    """
+
+    filled, excluded, n, one_d = _prepare(x, mask)
+    q_arr = np.atleast_1d(np.asarray(q, dtype=float))
+
+    last = np.maximum(n - 1, 0)
+    h = q_arr[:, np.newaxis] * last[np.newaxis, :]
+    lower = np.floor(h).astype(int)
+    upper = np.minimum(lower + 1, last)
+
+    values, part = _select(filled, np.vstack([lower, upper]))
+    v_lower = values[:len(q_arr)]
+    v_upper = values[len(q_arr):]
+
+    with np.errstate(invalid='ignore'):
+        result = v_lower + (h - lower) * (v_upper - v_lower)
+    result[:, n == 0] = np.nan
+
+    if np.ndim(q) == 0:
+        result = result[0]
+    return _finish(result, one_d)
+
+
+def median(x, mask=None):
+    """Returns the median of each column."""
+
+    return quantiles(x, 0.5, mask)
+
+
+def iqr(x, mask=None):
+    """Returns the interquartile range Q(0.75) - Q(0.25)."""
+
+    q_25, q_75 = quantiles(x, [0.25, 0.75], mask)
+    return q_75 - q_25
+
+
+def mean_abs_deviation(x, mask=None):
+    """Returns the mean absolute deviation around the mean.
+
+    Matches the removed pandas DataFrame.mad.
+    """
+
+    filled, excluded, n, one_d = _prepare(x, mask)
+    zero = filled.dtype.type(0)
+    values = np.where(excluded, zero, filled)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (pairwise_sum(values) / n).astype(filled.dtype)
+        result = (pairwise_sum(np.where(excluded, zero,
+                                        np.abs(values - mean)))
+                  / n).astype(float)
+    return _finish(result, one_d)
+
+
+def median_abs_deviation(x, scale=1.0, mask=None):
+    """Returns the median absolute deviation around the median.
+
+    Parameters
+    ----------
+    x : array_like
+        1-D or 2-D data, columns are variables.
+    scale : float/string
+        Multiplies the result, 'normal' uses `MAD_NORMAL_SCALE`
+        so the result estimates the standard deviation.
+    mask : None/array_like
+        True excludes a value.
+    """
+
+    if scale == 'normal':
+        scale = MAD_NORMAL_SCALE
+
+    filled, excluded, n, one_d = _prepare(x, mask)
+    centre = quantiles(filled, 0.5, excluded)
+    deviation = np.where(excluded, np.nan, np.abs(filled - centre))
+    result = scale * quantiles(deviation, 0.5)
+    return _finish(result, one_d)
+
+
+def robust_std(x, method='mad', mask=None):
+    """Returns a robust estimate of the standard deviation.
+
+    Parameters
+    ----------
+    x : array_like
+        1-D or 2-D data, columns are variables.
+    method : string
+        'mad' scales the median absolute deviation,
+        'iqr' scales the interquartile range.
+    mask : None/array_like
+        True excludes a value.
+    """
+
+    if method == 'mad':
+        return median_abs_deviation(x, 'normal', mask)
+    elif method == 'iqr':
+        return iqr(x, mask) / IQR_NORMAL_SCALE
+    raise ValueError(
+                     "method must be 'mad' or 'iqr', not {0!r}"
+                     .format(method)
+                     )
+
+
+def _trim_counts(n, proportion):
+    """Returns the number of values cut from each end."""
+
+    if not 0 <= proportion < 0.5:
+        raise ValueError("proportion must be in [0, 0.5)")
+    return np.floor(proportion * n).astype(int)
+
+
+def trimmed_mean(x, proportion=0.1, mask=None):
+    """Returns the mean after cutting a proportion from each end.
+
+    Matches scipy.stats.trim_mean, floor(proportion * n) values
+    are removed from each tail.
+    """
+
+    filled, excluded, n, one_d = _prepare(x, mask)
+    cut = _trim_counts(n, proportion)
+    low = cut
+    high = np.maximum(n - cut, low)
+
+    positions = np.vstack([np.minimum(low, filled.shape[0] - 1),
+                           np.minimum(high, filled.shape[0] - 1)])
+    values, part = _select(filled, positions)
+
+    # After partitioning at both ranks the middle rows hold
+    # exactly the kept values, in no particular order.
+    rows = np.arange(filled.shape[0])[:, np.newaxis]
+    kept = (rows >= low) & (rows < high)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = (pairwise_sum(np.where(kept, part, 0)).astype(float)
+                  / (high - low))
+    return _finish(result, one_d)
+
+
+def winsorized_mean(x, proportion=0.1, mask=None):
+    """Returns the mean after clamping a proportion at each end.
+
+    The floor(proportion * n) smallest values are replaced by the
+    next smallest, the same number of largest values by the next
+    largest, as in scipy.stats.mstats.winsorize.
+    """
+
+    filled, excluded, n, one_d = _prepare(x, mask)
+    cut = _trim_counts(n, proportion)
+    low = cut
+    high = np.maximum(n - cut, low)
+    top = np.maximum(high - 1, 0)
+
+    positions = np.vstack([np.minimum(low, filled.shape[0] - 1),
+                           np.minimum(top, filled.shape[0] - 1),
+                           np.minimum(high, filled.shape[0] - 1)])
+    values, part = _select(filled, positions)
+
+    rows = np.arange(filled.shape[0])[:, np.newaxis]
+    kept = (rows >= low) & (rows < high)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total = (pairwise_sum(np.where(kept, part, 0)).astype(float)
+                 + cut * values[0].astype(float)
+                 + cut * values[1].astype(float))
+        result = total / n
+    result[n == 0] = np.nan
+    return _finish(result, one_d)
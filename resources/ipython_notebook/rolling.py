@@ -0,0 +1,413 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    rolling
+    ~~~~~~~
+
+    This module keeps descriptive statistics over a sliding window of
+    time ordered sessions, the last N sessions or the last T units of
+    time, for monitoring drift while data is still being collected.
+
+    Each column holds its window in an indexable skiplist, so adding
+    or evicting a session and reading any quantile take expected
+    logarithmic time. Snapshots are `descriptive.Summary` objects and
+    render with `renderers` or `rendering.table_figure`.
+
+    Example::
+
+        window = RollingStats(['Congruent', 'Incongruent'], size=500,
+                              pairs=[('Incongruent', 'Congruent')])
+        for time, row in sessions:
+            window.update(row, time)
+        to_text(window.summary())
+        window.paired_test('Incongruent', 'Congruent')
+"""
+from __future__ import print_function
+from collections import deque
+from math import isfinite, log
+import random
+import numpy as np
+
+from descriptive import QUANTILES, build_summary
+from paired import paired_test_from_moments
+from sharded import difference_name
+
+
+class _Node(object):
+    """A skiplist node, links carry the width and the sum of the
+    values they skip over, the target included."""
+
+    __slots__ = ('value', 'next', 'width', 'sum')
+
+    def __init__(self, value, levels):
+        self.value = value
+        self.next = [None] * levels
+        self.width = [0] * levels
+        self.sum = [0.0] * levels
+
+
+class IndexableSkiplist(object):
+    """A sorted multiset with positional access.
+
+    Insertion, removal, indexing and rank queries take expected
+    O(log n) time. Links also carry partial sums, so the count and
+    sum of the values below any threshold come in one descent.
+
+    Parameters
+    ----------
+    expected_size : int
+        Sets the number of levels, performance degrades slowly
+        once the list grows well beyond it.
+    seed : None/int
+        Seed of the level draws.
+    """
+
+    def __init__(self, expected_size=1000, seed=None):
+        self.levels = int(1 + log(max(expected_size, 2), 2))
+        self._random = random.Random(seed)
+        self._tail = _Node(np.inf, 0)
+        self._head = _Node(None, self.levels)
+        self._head.next = [self._tail] * self.levels
+        self._head.width = [1] * self.levels
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        """Returns the i-th smallest value."""
+
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError('skiplist index out of range')
+
+        node = self._head
+        i += 1
+        for level in reversed(range(self.levels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not self._tail:
+            yield node.value
+            node = node.next[0]
+
+    def insert(self, value):
+        """Adds a value, equal values are kept side by side."""
+
+        chain = [None] * self.levels
+        steps_at_level = [0] * self.levels
+        sums_at_level = [0.0] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                sums_at_level[level] += node.sum[level]
+                node = node.next[level]
+            chain[level] = node
+
+        # Geometric number of levels, at least one.
+        d = min(self.levels, 1 - int(log(1.0 - self._random.random(), 2)))
+        new = _Node(value, d)
+
+        steps = 0
+        partial = 0.0
+        for level in range(d):
+            previous = chain[level]
+            new.next[level] = previous.next[level]
+            previous.next[level] = new
+            new.width[level] = previous.width[level] - steps
+            new.sum[level] = previous.sum[level] - partial
+            previous.width[level] = steps + 1
+            previous.sum[level] = partial + value
+            steps += steps_at_level[level]
+            partial += sums_at_level[level]
+        for level in range(d, self.levels):
+            chain[level].width[level] += 1
+            chain[level].sum[level] += value
+        self.size += 1
+
+    def remove(self, value):
+        """Removes one occurrence of a value, KeyError if absent."""
+
+        chain = [None] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target.value != value:
+            raise KeyError(value)
+
+        d = len(target.next)
+        for level in range(d):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.sum[level] += target.sum[level] - value
+            previous.next[level] = target.next[level]
+        for level in range(d, self.levels):
+            chain[level].width[level] -= 1
+            chain[level].sum[level] -= value
+        self.size -= 1
+
+    def count_sum_below(self, value):
+        """Returns the count and sum of the values below `value`."""
+
+        node = self._head
+        count = 0
+        total = 0.0
+        for level in reversed(range(self.levels)):
+            while node.next[level].value < value:
+                count += node.width[level]
+                total += node.sum[level]
+                node = node.next[level]
+        return count, total
+
+    def quantile(self, q):
+        """Returns a quantile with linear interpolation, as
+        pandas and numpy do by default."""
+
+        if self.size == 0:
+            return np.nan
+        h = (self.size - 1) * q
+        lower = int(h)
+        value = self[lower]
+        if lower + 1 < self.size and h > lower:
+            value += (h - lower) * (self[lower + 1] - value)
+        return value
+
+
+class RollingStats(object):
+    """Descriptive statistics over a sliding window of sessions.
+
+    The window keeps the last `size` sessions, the sessions of the
+    last `duration` time units, or both limits at once. Missing
+    values are ignored per column, as in `descriptive`, and so are
+    infinite ones (e.g. timeouts stored as inf).
+
+    Parameters
+    ----------
+    columns : list
+        Names of the values of a session.
+    size : None/int
+        Largest number of sessions in the window.
+    duration : None/number/timedelta
+        Sessions older than the latest time minus `duration` are
+        evicted. Times may be numbers or datetimes.
+    pairs : list
+        Pairs of column names (a, b). The difference a - b is kept
+        as an extra column named 'a - b', for `paired_test`.
+    expected_size : int
+        Sizes the skiplists, defaults to `size` when given.
+
+    Attributes
+    ----------
+    columns : list
+        Column names, differences last.
+    count : ndarray
+        Number of non missing values in the window.
+    mean, m2 : ndarray
+        Mean and sum of squared deviations, updated in place.
+    """
+
+    def __init__(self, columns, size=None, duration=None, pairs=(),
+                 expected_size=None):
+        if size is None and duration is None:
+            raise ValueError("size or duration must be given")
+
+        self.size = size
+        self.duration = duration
+        self.pairs = [tuple(pair) for pair in pairs]
+        self._names = list(columns)
+        index = dict((name, i) for i, name in enumerate(columns))
+        self._pair_index = [(index[a], index[b]) for a, b in self.pairs]
+        self.columns = (list(columns)
+                        + [difference_name(a, b) for a, b in self.pairs])
+
+        k = len(self.columns)
+        expected_size = expected_size or size or 1000
+        self._lists = [IndexableSkiplist(expected_size) for i in range(k)]
+        self._sessions = deque()
+        # Python lists, cheaper than arrays for scalar updates.
+        self._count = [0] * k
+        self._mean = [0.0] * k
+        self._m2 = [0.0] * k
+
+    def __len__(self):
+        """Number of sessions in the window."""
+        return len(self._sessions)
+
+    @property
+    def count(self):
+        """Number of non missing values per column."""
+        return np.array(self._count)
+
+    @property
+    def mean(self):
+        """Mean per column, 0 for an empty column."""
+        return np.array(self._mean)
+
+    @property
+    def m2(self):
+        """Sum of squared deviations per column."""
+        return np.array(self._m2)
+
+    def _row(self, values):
+        """Returns the values of one session with its differences."""
+
+        if isinstance(values, dict):
+            row = [float(values[name]) for name in self._names]
+        else:
+            row = [float(v) for v in values]
+        row += [row[a] - row[b] for a, b in self._pair_index]
+        return row
+
+    def _add(self, row):
+        for i, x in enumerate(row):
+            if not isfinite(x):  # Missing or infinite
+                continue
+            self._lists[i].insert(x)
+            n = self._count[i] + 1
+            delta = x - self._mean[i]
+            self._mean[i] += delta / n
+            self._m2[i] += delta * (x - self._mean[i])
+            self._count[i] = n
+
+    def _remove(self, row):
+        for i, x in enumerate(row):
+            if not isfinite(x):
+                continue
+            self._lists[i].remove(x)
+            n = self._count[i] - 1
+            if n == 0:
+                self._mean[i] = 0.0
+                self._m2[i] = 0.0
+            else:
+                delta = x - self._mean[i]
+                self._mean[i] -= delta / n
+                self._m2[i] -= delta * (x - self._mean[i])
+            self._count[i] = n
+
+    def update(self, values, time=None):
+        """Adds one session and evicts those outside the window.
+
+        Parameters
+        ----------
+        values : dict/sequence
+            Values of the session, by name or in column order.
+        time : None/number/datetime
+            Time of the session, required with `duration`. Times
+            must not decrease.
+        """
+
+        if self.duration is not None and time is None:
+            raise ValueError("time must be given with a duration")
+
+        row = self._row(values)
+        self._sessions.append((time, row))
+        self._add(row)
+
+        if self.size is not None:
+            while len(self._sessions) > self.size:
+                self._remove(self._sessions.popleft()[1])
+        if self.duration is not None:
+            start = time - self.duration
+            while self._sessions and self._sessions[0][0] <= start:
+                self._remove(self._sessions.popleft()[1])
+
+    def extend(self, rows, times=None):
+        """Adds many sessions in order, see `update`.
+
+        Parameters
+        ----------
+        rows : DataFrame/iterable
+            A DataFrame is read by column name.
+        times : None/iterable
+            One time per row.
+        """
+
+        if hasattr(rows, 'columns'):
+            rows = rows[self._names].to_numpy(dtype=float)
+        if times is None:
+            times = [None] * len(rows)
+        for time, values in zip(times, rows):
+            self.update(values, time)
+
+    def statistics(self):
+        """Returns the values used by `descriptive.build_summary`."""
+
+        probs = [0.25, 0.5, 0.75] + [p for k, p in QUANTILES]
+        quantiles = np.array([[skiplist.quantile(p) for p in probs]
+                              for skiplist in self._lists]).T
+
+        count = self.count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = np.where(count > 1, np.maximum(self.m2, 0) / (count - 1),
+                           np.nan)
+            mean = np.where(count > 0, self.mean, np.nan)
+
+        v_max = np.array([s[-1] if len(s) else np.nan for s in self._lists])
+        v_min = np.array([s[0] if len(s) else np.nan for s in self._lists])
+
+        values = {
+                  'count': count,
+                  'mean': mean,
+                  'median': quantiles[1],
+                  'std': np.sqrt(var),
+                  'iqr': quantiles[2] - quantiles[0],
+                  'mad': np.array([self._mean_abs_deviation(i)
+                                   for i in range(len(self.columns))]),
+                  'var': var,
+                  'range': v_max - v_min,
+                  'max': v_max,
+                  'min': v_min,
+                  }
+        for i, (key, prob) in enumerate(QUANTILES):
+            values[key] = quantiles[3 + i]
+
+        return values
+
+    def _mean_abs_deviation(self, i):
+        """Mean absolute deviation around the mean, from the
+        count and sum below the mean."""
+
+        n = self._count[i]
+        if n == 0:
+            return np.nan
+        mean = self._mean[i]
+        below, below_sum = self._lists[i].count_sum_below(mean)
+        total = mean * n
+        deviation = ((mean * below - below_sum)
+                     + (total - below_sum) - mean * (n - below))
+        return deviation / n
+
+    def summary(self, column_name=None):
+        """Returns a `descriptive.Summary` snapshot of the window.
+
+        Parameters
+        ----------
+        column_name : None/list
+            Names to show, None uses `columns`.
+        """
+
+        if column_name is None:
+            column_name = self.columns
+        return build_summary(column_name, self.statistics())
+
+    def paired_test(self, name_a, name_b, **kwargs):
+        """Returns the paired t test of a - b over the window.
+
+        The pair must have been given as `pairs`, other keyword
+        arguments pass to `paired.paired_test_from_moments`.
+        """
+
+        i = self.columns.index(difference_name(name_a, name_b))
+        sd = np.sqrt(max(self._m2[i], 0) / (self._count[i] - 1))
+        return paired_test_from_moments(self._count[i], self._mean[i], sd,
+                                        **kwargs)
@@ -0,0 +1,299 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    screening
+    ~~~~~~~~~
+
+    This module flags anomalous participants or sessions, such as
+    timeouts and device glitches, with fences built from the same
+    statistics the dispersion table reports.
+
+    Screening streams over chunks (e.g. `pandas.read_csv` with a
+    chunksize), holding one chunk at a time, and can exclude the
+    flagged rows from the paired t test in the same pass.
+"""
+from __future__ import print_function
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+import robust
+from descriptive import section
+from sharded import PartialStats, combine
+
+Fences = namedtuple('Fences', ['columns', 'lower', 'upper', 'method', 'k'])
+
+# Result of one chunk, `flagged` holds row positions in the stream.
+ChunkScreen = namedtuple('ChunkScreen', ['start', 'size', 'flagged',
+                                         'counts'])
+
+Screening = namedtuple('Screening', [
+                                     'fences',
+                                     'flagged',
+                                     'chunk_counts',
+                                     'column_counts',
+                                     'rows',
+                                     'kept'
+                                     ])
+
+# Default fence multipliers, Tukey's 1.5 IQR and 3 (robust) sd.
+DEFAULT_K = {'iqr': 1.5, 'mad': 3.0, 'meanad': 3.0}
+
+# Mean absolute deviation to standard deviation for normal data.
+MEAN_AD_NORMAL_SCALE = np.sqrt(np.pi / 2)
+
+
+def _default_k(method, k, methods):
+    """Returns the multiplier, checking the method name."""
+
+    if method not in methods:
+        raise ValueError(
+                         "method must be {0}, not {1!r}"
+                         .format(" or ".join(repr(m) for m in methods),
+                                 method)
+                         )
+    return DEFAULT_K[method] if k is None else k
+
+
+def fences(data, columns=None, method='iqr', k=None):
+    """Returns fences computed from a sample.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Sample used to place the fences.
+    columns : None/list
+        Columns to screen, None uses all columns.
+    method : string
+        'iqr' gives Tukey fences Q(0.25) - k IQR and
+        Q(0.75) + k IQR. 'mad' gives median -/+ k times the
+        normal scaled median absolute deviation, robust to the
+        outliers being screened.
+    k : None/float
+        Multiplier, None uses `DEFAULT_K`.
+
+    Returns
+    -------
+    fences : Fences
+    """
+
+    k = _default_k(method, k, ('iqr', 'mad'))
+    if columns is None:
+        columns = list(data.columns)
+    x = data[list(columns)].to_numpy(dtype=float)
+
+    if method == 'iqr':
+        q_25, q_75 = robust.quantiles(x, [0.25, 0.75])
+        spread = q_75 - q_25
+        lower, upper = q_25 - k * spread, q_75 + k * spread
+    else:
+        centre = robust.median(x)
+        spread = robust.median_abs_deviation(x, 'normal')
+        lower, upper = centre - k * spread, centre + k * spread
+
+    return Fences(list(columns), lower, upper, method, k)
+
+
+def fences_from_summary(summary, method='iqr', k=None):
+    """Returns fences from a `descriptive.Summary`.
+
+    Uses the numbers shown in the tables, so a summary merged
+    from shards (`sharded.PartialStats.summary`) places fences
+    without another pass over the data.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+    method : string
+        'iqr' gives Tukey fences from Q(0.25), Q(0.75) and the
+        IQR. 'meanad' gives mean -/+ k times the table's mean
+        absolute deviation scaled to a normal standard deviation.
+        Unlike the 'mad' fences of `fences` (median absolute
+        deviation) these are not robust, large outliers shift
+        the mean and widen the fences, prefer 'iqr'.
+    k : None/float
+        Multiplier, None uses `DEFAULT_K`.
+
+    Returns
+    -------
+    fences : Fences
+    """
+
+    k = _default_k(method, k, ('iqr', 'meanad'))
+    values = dict((stat.key, stat.values) for sec in summary.sections
+                  for stat in sec.statistics)
+
+    if method == 'iqr':
+        spread = values['iqr']
+        lower = values['q25'] - k * spread
+        upper = values['q75'] + k * spread
+    else:
+        spread = MEAN_AD_NORMAL_SCALE * values['mad']
+        lower = values['mean'] - k * spread
+        upper = values['mean'] + k * spread
+
+    return Fences(list(summary.columns), lower, upper, method, k)
+
+
+def _values(chunk, columns):
+    """Returns the screened columns of a chunk as floats."""
+
+    if isinstance(chunk, pd.DataFrame):
+        return chunk[columns].to_numpy(dtype=float)
+    return np.asarray(chunk, dtype=float).reshape(len(chunk), -1)
+
+
+def screen_chunk(chunk, limits, start=0):
+    """Flags the rows of one chunk outside the fences.
+
+    A row is flagged when any screened column is outside its
+    fences, missing values are never flagged.
+
+    Parameters
+    ----------
+    chunk : DataFrame/ndarray
+        Rows to screen, arrays hold the fence columns in order.
+    limits : Fences
+    start : int
+        Position of the first row in the whole stream.
+
+    Returns
+    -------
+    result : ChunkScreen
+    """
+
+    x = _values(chunk, limits.columns)
+    outside = (x < limits.lower) | (x > limits.upper)
+    flagged = np.flatnonzero(outside.any(axis=1)) + start
+    return ChunkScreen(start, x.shape[0], flagged, outside.sum(axis=0))
+
+
+def iter_screen(chunks, limits):
+    """Yields a `ChunkScreen` per chunk of a stream."""
+
+    start = 0
+    for chunk in chunks:
+        result = screen_chunk(chunk, limits, start)
+        start += result.size
+        yield result
+
+
+def screen(chunks, limits, pairs=(), exclude=True):
+    """Screens a stream of chunks and summarises the kept rows.
+
+    Parameters
+    ----------
+    chunks : iterable
+        DataFrames, e.g. pandas.read_csv(path, chunksize=...).
+    limits : Fences
+    pairs : list
+        Pairs of column names (a, b). When given, partial
+        statistics of the rows are accumulated for
+        `Screening.kept.paired_test(a, b)`.
+    exclude : boolean
+        True leaves flagged rows out of the kept statistics.
+
+    Returns
+    -------
+    result : Screening
+        Flagged row positions, flags per chunk and per column,
+        the number of rows and the kept statistics (None
+        without pairs).
+    """
+
+    flagged = []
+    chunk_counts = []
+    column_counts = np.zeros(len(limits.columns), dtype=int)
+    partials = []
+    rows = 0
+
+    for chunk in chunks:
+        result = screen_chunk(chunk, limits, rows)
+        rows += result.size
+        flagged.append(result.flagged)
+        chunk_counts.append(result.flagged.size)
+        column_counts += result.counts
+
+        if pairs:
+            kept = chunk
+            if exclude and result.flagged.size:
+                keep = np.ones(result.size, dtype=bool)
+                keep[result.flagged - result.start] = False
+                kept = chunk[keep]
+            partials.append(PartialStats.from_frame(kept, limits.columns,
+                                                    pairs))
+
+    return Screening(
+                     limits,
+                     np.concatenate(flagged) if flagged else
+                     np.array([], dtype=int),
+                     np.asarray(chunk_counts, dtype=int),
+                     column_counts,
+                     rows,
+                     combine(partials) if partials else None
+                     )
+
+
+def screen_csv(path, columns, method='iqr', k=None, pairs=(),
+               chunksize=10 ** 6, exclude=True, read_csv_kwargs=None):
+    """Screens a CSV file in two streamed passes.
+
+    The first pass merges partial statistics of every chunk to
+    place the fences, the second flags rows and, with `pairs`,
+    summarises the kept rows for the paired t test.
+
+    Parameters
+    ----------
+    path : string
+        Location of the CSV file.
+    columns : list
+        Columns to screen.
+    method, k
+        See `fences_from_summary`.
+    pairs, exclude
+        See `screen`.
+    chunksize : int
+        Rows read at a time.
+    read_csv_kwargs : None/dict
+        Passed to `pandas.read_csv`.
+
+    Returns
+    -------
+    result : Screening
+    """
+
+    kwargs = {'sep': ','}
+    kwargs.update(read_csv_kwargs or {})
+
+    partial = combine(PartialStats.from_frame(chunk, columns)
+                      for chunk in pd.read_csv(path, chunksize=chunksize,
+                                               **kwargs))
+    limits = fences_from_summary(partial.summary(), method, k)
+
+    chunks = pd.read_csv(path, chunksize=chunksize, **kwargs)
+    return screen(chunks, limits, pairs, exclude)
+
+
+def dispersion_fences(summary, method='iqr', k=None):
+    """Returns the fences as a table next to the Dispersion section.
+
+    Parameters
+    ----------
+    summary : descriptive.Summary
+    method, k
+        See `fences_from_summary`.
+
+    Returns
+    -------
+    table : DataFrame
+        Rows are the dispersion statistics then the lower and
+        upper fence, one column per summary column.
+    """
+
+    limits = fences_from_summary(summary, method, k)
+    sec = section(summary, 'Dispersion')
+    rows = [stat.values for stat in sec.statistics]
+    rows += [limits.lower, limits.upper]
+    labels = [stat.label for stat in sec.statistics]
+    labels += ['lower fence', 'upper fence']
+    return pd.DataFrame(rows, index=labels, columns=summary.columns)
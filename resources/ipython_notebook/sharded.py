@@ -0,0 +1,404 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    sharded
+    ~~~~~~~
+
+    This module summarises data arriving as many CSV shards.
+
+    Each shard is reduced, in a process pool, to a mergeable partial
+    state: counts, compensated sums, central moments, min/max and a
+    quantile sketch per column. Partials merge associatively into the
+    descriptive table and the paired t test, so a changed shard only
+    needs its own partial recomputed.
+"""
+from __future__ import print_function
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+from descriptive import QUANTILES, build_summary
+from paired import paired_test_from_moments
+
+
+def _k_scale(q, compression):
+    """The t-digest k1 scale function, finer at the tails."""
+
+    return compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+
+
+class QuantileSketch(object):
+    """A mergeable quantile sketch of one column (a t-digest).
+
+    Values are held as weighted centroids sorted by mean. While
+    there are no more than `compression` centroids every value is
+    kept, so quantiles of small samples are exact and match pandas'
+    linear interpolation.
+
+    Parameters
+    ----------
+    means : array_like
+        Centroid means, sorted.
+    weights : array_like
+        Number of values in each centroid.
+    compression : int
+        Controls size and accuracy, at most about
+        compression / 2 centroids after compressing.
+    """
+
+    def __init__(self, means=(), weights=(), compression=200):
+        self.means = np.asarray(means, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.compression = compression
+        if self.means.size:
+            self.min = self.means[0]
+            self.max = self.means[-1]
+        else:
+            self.min = np.nan
+            self.max = np.nan
+
+    @classmethod
+    def from_array(cls, x, compression=200):
+        """Returns a sketch of the non missing values in `x`."""
+
+        x = np.asarray(x, dtype=float)
+        x = np.sort(x[~np.isnan(x)])
+        sketch = cls(x, np.ones(x.size), compression)
+        sketch._compress()
+        return sketch
+
+    @property
+    def count(self):
+        return self.weights.sum()
+
+    def _compress(self):
+        """Merges neighbouring centroids within one unit of k."""
+
+        if self.means.size <= self.compression:
+            return
+
+        total = self.weights.sum()
+        cum = np.cumsum(self.weights)
+        q_mid = (cum - self.weights / 2.) / total
+        bucket = np.floor(_k_scale(q_mid, self.compression)
+                          + self.compression / 4.)
+
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        weights = np.add.reduceat(self.weights, starts)
+        sums = np.add.reduceat(self.weights * self.means, starts)
+        self.means = sums / weights
+        self.weights = weights
+
+    def merge(self, other):
+        """Returns a new sketch combining both sketches."""
+
+        means = np.concatenate([self.means, other.means])
+        weights = np.concatenate([self.weights, other.weights])
+        order = np.argsort(means, kind='mergesort')
+
+        merged = QuantileSketch(means[order], weights[order],
+                                max(self.compression, other.compression))
+        merged.min = np.fmin(self.min, other.min)
+        merged.max = np.fmax(self.max, other.max)
+        merged._compress()
+        return merged
+
+    def quantile(self, q):
+        """Returns quantile(s) with linear interpolation.
+
+        Parameters
+        ----------
+        q : float/array_like
+            Probabilities between 0 and 1.
+        """
+
+        q = np.asarray(q, dtype=float)
+        if not self.means.size:
+            return np.full(q.shape, np.nan)
+
+        total = self.weights.sum()
+        # Centre rank of each centroid, for singletons this is
+        # the 0 based position used by linear interpolation.
+        centres = np.cumsum(self.weights) - (self.weights + 1) / 2.
+        ranks = np.r_[0, centres, total - 1]
+        values = np.r_[self.min, self.means, self.max]
+        return np.interp(q * (total - 1), ranks, values)
+
+    def mean_abs_deviation(self, centre):
+        """Returns the mean absolute deviation around `centre`."""
+
+        return (np.sum(self.weights * np.abs(self.means - centre))
+                / self.weights.sum())
+
+
+class PartialStats(object):
+    """Mergeable partial statistics for a set of columns.
+
+    All attributes are arrays with one value per column, apart
+    from `sketches`, a list of `QuantileSketch`.
+
+    Attributes
+    ----------
+    columns : list
+        Column names.
+    count : ndarray
+        Number of non missing values.
+    total, compensation : ndarray
+        Sum of values and its rounding error, the compensated
+        sum is total + compensation.
+    mean, m2, m3, m4 : ndarray
+        Mean and sums of 2nd, 3rd and 4th powers of deviations.
+    min, max : ndarray
+    sketches : list
+    """
+
+    def __init__(self, columns, count, total, compensation,
+                 mean, m2, m3, m4, v_min, v_max, sketches):
+        self.columns = list(columns)
+        self.count = count
+        self.total = total
+        self.compensation = compensation
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+        self.min = v_min
+        self.max = v_max
+        self.sketches = sketches
+
+    @classmethod
+    def from_frame(cls, data, columns=None, pairs=(), compression=200):
+        """Returns the partial statistics of one DataFrame.
+
+        Parameters
+        ----------
+        data : DataFrame
+        columns : None/list
+            Columns to summarise, None uses all columns.
+        pairs : list
+            Pairs of column names (a, b). The difference a - b is
+            summarised as an extra column named 'a - b', the input
+            to the paired t test.
+        compression : int
+            Accuracy of the quantile sketches.
+        """
+
+        if columns is None:
+            columns = list(data.columns)
+        x = data[list(columns)].to_numpy(dtype=float)
+
+        if pairs:
+            diffs = [(data[a].to_numpy(dtype=float)
+                      - data[b].to_numpy(dtype=float)) for a, b in pairs]
+            x = np.column_stack([x] + diffs)
+            columns = list(columns) + [difference_name(a, b)
+                                       for a, b in pairs]
+
+        present = ~np.isnan(x)
+        count = present.sum(axis=0).astype(float)
+        total = np.where(present, x, 0).sum(axis=0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Pairwise sums of the residuals recover the rounding
+            # error of the first sum.
+            first_mean = total / count
+            deviation = np.where(present, x - first_mean, 0)
+            compensation = deviation.sum(axis=0)
+            mean = (total + compensation) / count
+            deviation = np.where(present, x - mean, 0)
+
+        squared = deviation * deviation
+        m2 = squared.sum(axis=0)
+        m3 = (squared * deviation).sum(axis=0)
+        m4 = (squared * squared).sum(axis=0)
+
+        if x.shape[0] == 0:
+            # An empty shard, e.g. a header only CSV.
+            v_min = np.full(x.shape[1], np.nan)
+            v_max = np.full(x.shape[1], np.nan)
+        else:
+            with np.errstate(invalid='ignore'):
+                v_min = np.where(count > 0, np.nanmin(
+                    np.where(present, x, np.inf), axis=0), np.nan)
+                v_max = np.where(count > 0, np.nanmax(
+                    np.where(present, x, -np.inf), axis=0), np.nan)
+
+        sketches = [QuantileSketch.from_array(x[:, i], compression)
+                    for i in range(x.shape[1])]
+
+        return cls(columns, count, total, compensation,
+                   mean, m2, m3, m4, v_min, v_max, sketches)
+
+    def merge(self, other):
+        """Returns the partial statistics of both inputs combined.
+
+        Moments combine with the pairwise update formulas of
+        Chan et al. and Pebay, sums are added with a compensated
+        (two sum) addition.
+        """
+
+        if self.columns != other.columns:
+            raise ValueError("partials summarise different columns")
+
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+
+        # Two sum of the totals, keeps the lost low order bits.
+        total = self.total + other.total
+        b_virtual = total - self.total
+        error = ((self.total - (total - b_virtual))
+                 + (other.total - b_virtual))
+        compensation = self.compensation + other.compensation + error
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(n > 0, (total + compensation) / n, np.nan)
+            delta = np.where((n_a > 0) & (n_b > 0),
+                             other.mean - self.mean, 0)
+            n_safe = np.where(n > 0, n, 1)
+
+            m2 = (self.m2 + other.m2
+                  + delta ** 2 * n_a * n_b / n_safe)
+            m3 = (self.m3 + other.m3
+                  + delta ** 3 * n_a * n_b * (n_a - n_b) / n_safe ** 2
+                  + 3 * delta * (n_a * other.m2 - n_b * self.m2) / n_safe)
+            m4 = (self.m4 + other.m4
+                  + delta ** 4 * n_a * n_b
+                  * (n_a ** 2 - n_a * n_b + n_b ** 2) / n_safe ** 3
+                  + 6 * delta ** 2
+                  * (n_a ** 2 * other.m2 + n_b ** 2 * self.m2) / n_safe ** 2
+                  + 4 * delta * (n_a * other.m3 - n_b * self.m3) / n_safe)
+
+        sketches = [a.merge(b) for a, b in zip(self.sketches,
+                                               other.sketches)]
+
+        return PartialStats(self.columns, n, total, compensation, mean,
+                            m2, m3, m4, np.fmin(self.min, other.min),
+                            np.fmax(self.max, other.max), sketches)
+
+    def statistics(self):
+        """Returns the values used by `descriptive.build_summary`."""
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = self.m2 / (self.count - 1)
+
+        quantiles = np.array([s.quantile([0.25, 0.5, 0.75] +
+                                         [p for k, p in QUANTILES])
+                              for s in self.sketches]).T
+
+        values = {
+                  'count': self.count.astype(int),
+                  'mean': self.mean,
+                  'median': quantiles[1],
+                  'std': np.sqrt(var),
+                  'iqr': quantiles[2] - quantiles[0],
+                  'mad': np.array([s.mean_abs_deviation(m) for s, m
+                                   in zip(self.sketches, self.mean)]),
+                  'var': var,
+                  'range': self.max - self.min,
+                  'max': self.max,
+                  'min': self.min,
+                  }
+        for i, (key, prob) in enumerate(QUANTILES):
+            values[key] = quantiles[3 + i]
+
+        return values
+
+    def summary(self, column_name=None):
+        """Returns a `descriptive.Summary` of the merged data.
+
+        Parameters
+        ----------
+        column_name : None/list
+            Names to show, None uses the summarised columns.
+        """
+
+        if column_name is None:
+            column_name = self.columns
+        return build_summary(column_name, self.statistics())
+
+    def paired_test(self, name_a, name_b, **kwargs):
+        """Returns the paired t test of a - b.
+
+        The pair must have been given to `from_frame`, other
+        keyword arguments pass to `paired.paired_test_from_moments`.
+        """
+
+        i = self.columns.index(difference_name(name_a, name_b))
+        sd = np.sqrt(self.m2[i] / (self.count[i] - 1))
+        return paired_test_from_moments(self.count[i], self.mean[i], sd,
+                                        **kwargs)
+
+
+def difference_name(name_a, name_b):
+    """Returns the column name used for the difference a - b."""
+
+    return '{0} - {1}'.format(name_a, name_b)
+
+
+def combine(partials):
+    """Returns a single partial merging all `partials`."""
+
+    return reduce(lambda a, b: a.merge(b), partials)
+
+
+def summarize_shard(path, columns=None, pairs=(), compression=200,
+                    read_csv_kwargs=None):
+    """Returns the partial statistics of one CSV shard.
+
+    Parameters
+    ----------
+    path : string
+        Location of the CSV file.
+    columns, pairs, compression
+        See `PartialStats.from_frame`.
+    read_csv_kwargs : None/dict
+        Passed to `pandas.read_csv`.
+    """
+
+    kwargs = {'sep': ','}
+    kwargs.update(read_csv_kwargs or {})
+    data = pd.read_csv(path, **kwargs)
+    return PartialStats.from_frame(data, columns, pairs, compression)
+
+
+def _summarize_job(job):
+    """Runs `summarize_shard` in a worker process."""
+
+    return summarize_shard(*job)
+
+
+def summarize_shards(paths, columns=None, pairs=(), compression=200,
+                     read_csv_kwargs=None, workers=None):
+    """Returns the partial statistics of every shard.
+
+    Shards are summarised in a process pool. Keep the returned
+    partials to re-aggregate cheaply, replacing only those of
+    shards that changed before calling `combine`.
+
+    Parameters
+    ----------
+    paths : list
+        Locations of the CSV shards.
+    columns, pairs, compression
+        See `PartialStats.from_frame`.
+    read_csv_kwargs : None/dict
+        Passed to `pandas.read_csv`.
+    workers : None/int
+        Number of processes, None uses all cores and 1 runs in
+        the current process.
+
+    Returns
+    -------
+    partials : list
+        One `PartialStats` per path, in the same order.
+    """
+
+    jobs = [(path, columns, tuple(pairs), compression, read_csv_kwargs)
+            for path in paths]
+
+    if workers == 1:
+        return [_summarize_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_summarize_job, jobs))
@@ -0,0 +1,310 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    synthetic
+    ~~~~~~~~~
+
+    This module generates seeded synthetic Stroop data at any size,
+    for load testing `figures`, `tables` and the analysis modules.
+
+    Participant level data has the same Congruent and Incongruent
+    columns as stroopdata.csv, defaults follow that sample. Trial
+    level data has one row per word named. Generation is vectorized
+    and large outputs are streamed in chunks to memory mapped .npy
+    files or CSV shards, so memory stays bounded.
+"""
+from __future__ import print_function
+import os
+import numpy as np
+import pandas as pd
+
+# Record layout of trial level data.
+TRIAL_DTYPE = np.dtype([
+                        ('participant', 'i8'),
+                        ('condition', 'i1'),  # 0 Congruent, 1 Incongruent
+                        ('order', 'i1'),  # Block position, 0 or 1
+                        ('trial', 'i4'),
+                        ('rt', 'f4')  # Seconds
+                        ])
+
+CONDITIONS = ('Congruent', 'Incongruent')
+
+
+def _standard_scores(rng, n, rho, shape, distribution, mixture_weight):
+    """Returns two rows of correlated scores, mean 0 variance 1.
+
+    Parameters
+    ----------
+    rng : numpy Generator
+    n : int
+        Number of participants.
+    rho : float
+        Correlation of the normal component between conditions.
+    shape : float
+        Share of variance from the exponential tail ('exgauss')
+        or from the participant clusters ('mixture').
+    distribution : string
+        'normal', 'exgauss' or 'mixture'.
+    mixture_weight : float
+        Share of participants in the slow cluster.
+    """
+
+    z_shared = rng.standard_normal(n)
+    z = (np.sqrt(rho) * z_shared
+         + np.sqrt(1 - rho) * rng.standard_normal((2, n)))
+
+    if distribution == 'normal':
+        return z
+
+    if distribution == 'exgauss':
+        tail = rng.standard_exponential((2, n)) - 1
+        return np.sqrt(1 - shape) * z + np.sqrt(shape) * tail
+
+    if distribution == 'mixture':
+        # A participant is slow or fast in both conditions.
+        slow = rng.random(n) < mixture_weight
+        cluster = ((slow - mixture_weight)
+                   / np.sqrt(mixture_weight * (1 - mixture_weight)))
+        return np.sqrt(1 - shape) * z + np.sqrt(shape) * cluster
+
+    raise ValueError(
+                     "distribution must be 'normal', 'exgauss' or "
+                     "'mixture', not {0!r}".format(distribution)
+                     )
+
+
+def participants(n, seed=None, congruent_mean=14.05, congruent_sd=3.56,
+                 effect=7.97, incongruent_sd=4.80, rho=0.5, shape=0.3,
+                 distribution='exgauss', mixture_weight=0.3,
+                 minimum_time=1.0):
+    """Returns paired Congruent and Incongruent times.
+
+    Parameters
+    ----------
+    n : int
+        Number of participants.
+    seed : None/int/numpy Generator
+        Seed or generator for reproducible data.
+    congruent_mean, congruent_sd : float
+        Mean and standard deviation of Congruent times, seconds.
+    effect : float
+        Mean Incongruent - Congruent time, seconds.
+    incongruent_sd : float
+        Standard deviation of Incongruent times, seconds.
+    rho : float
+        Within participant correlation of the normal component.
+        With the default shape the correlation of the times is
+        about 0.35, as in stroopdata.csv.
+    shape : float
+        Between 0 and 1, see `distribution`.
+    distribution : string
+        'exgauss' is right skewed, `shape` is the share of variance
+        from the exponential tail. 'mixture' has a fast and a slow
+        group of participants, `shape` is the share of variance
+        between groups, the shared group raises the correlation.
+        'normal' ignores `shape`.
+    mixture_weight : float
+        Share of participants in the slow group.
+    minimum_time : float
+        Times are clipped below at this value.
+
+    Returns
+    -------
+    data : DataFrame
+        Columns Congruent and Incongruent.
+    """
+
+    rng = np.random.default_rng(seed)
+    scores = _standard_scores(rng, n, rho, shape, distribution,
+                              mixture_weight)
+
+    congruent = congruent_mean + congruent_sd * scores[0]
+    incongruent = congruent_mean + effect + incongruent_sd * scores[1]
+
+    return pd.DataFrame({
+                         'Congruent': np.maximum(congruent, minimum_time),
+                         'Incongruent': np.maximum(incongruent,
+                                                   minimum_time)
+                         })
+
+
+def trials(n, n_trials=24, seed=None, trial_sd=0.15, trial_tail=0.15,
+           carryover=0.0, first=None, **kwargs):
+    """Returns trial level data, one record per word named.
+
+    Each participant's condition total is drawn by `participants`,
+    the trials of a block are that total divided evenly plus ex-
+    Gaussian noise per trial.
+
+    Parameters
+    ----------
+    n : int
+        Number of participants.
+    n_trials : int
+        Words per condition.
+    seed : None/int/numpy Generator
+        Seed or generator for reproducible data.
+    trial_sd : float
+        Standard deviation of the normal trial noise, seconds.
+    trial_tail : float
+        Mean of the exponential trial noise, seconds.
+    carryover : float
+        Seconds saved per trial in the second block from
+        practice on the first.
+    first : None/array_like
+        Condition shown first (0 Congruent, 1 Incongruent) per
+        participant, None counterbalances at random.
+    **kwargs
+        Passed to `participants`.
+
+    Returns
+    -------
+    records : ndarray
+        Structured array of `TRIAL_DTYPE`, ordered by participant,
+        block and trial.
+    """
+
+    rng = np.random.default_rng(seed)
+    totals = participants(n, seed=rng, **kwargs)[list(CONDITIONS)].values
+
+    if first is None:
+        first = rng.integers(0, 2, size=n)
+    first = np.asarray(first, dtype=np.int8)
+
+    # Shape (participant, block, trial) with block 0 shown first.
+    condition = np.stack([first, 1 - first], axis=1)
+    block_total = np.take_along_axis(totals, condition, axis=1)
+    per_trial = block_total / float(n_trials)
+    per_trial[:, 1] -= carryover
+
+    noise = (trial_sd * rng.standard_normal((n, 2, n_trials))
+             + trial_tail * (rng.standard_exponential((n, 2, n_trials))
+                             - 1))
+    rt = np.maximum(per_trial[:, :, np.newaxis] + noise, 0.05)
+
+    records = np.empty(n * 2 * n_trials, dtype=TRIAL_DTYPE)
+    records['participant'] = np.repeat(np.arange(n), 2 * n_trials)
+    records['condition'] = np.repeat(condition.ravel(), n_trials)
+    records['order'] = np.tile(np.repeat([0, 1], n_trials), n)
+    records['trial'] = np.tile(np.arange(n_trials), 2 * n)
+    records['rt'] = rt.ravel()
+    return records
+
+
+def _chunks(total, chunk_size, seed):
+    """Yields (start, size, seed) covering `total` rows."""
+
+    starts = range(0, total, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    for start, chunk_seed in zip(starts, seeds):
+        yield start, min(chunk_size, total - start), chunk_seed
+
+
+def write_participants(path, n, chunk_size=10 ** 6, seed=None, **kwargs):
+    """Streams participant data to a memory mapped .npy file.
+
+    Only one chunk is held in memory at a time. The file holds a
+    float64 array of shape (n, 2), columns Congruent then
+    Incongruent, and opens with np.load(path, mmap_mode='r').
+
+    Parameters
+    ----------
+    path : string
+        Output .npy file.
+    n : int
+        Number of participants.
+    chunk_size : int
+        Participants generated per chunk. Results depend on
+        the seed and the chunk size.
+    seed : None/int
+        Seed for reproducible data.
+    **kwargs
+        Passed to `participants`.
+
+    Returns
+    -------
+    path : string
+    """
+
+    out = np.lib.format.open_memmap(path, mode='w+', dtype='f8',
+                                    shape=(n, 2))
+    for start, size, chunk_seed in _chunks(n, chunk_size, seed):
+        data = participants(size, seed=chunk_seed, **kwargs)
+        out[start:start + size] = data[list(CONDITIONS)].values
+    out.flush()
+    del out
+    return path
+
+
+def write_shards(directory, n, rows_per_shard=10 ** 6, seed=None,
+                 prefix='stroopdata', **kwargs):
+    """Streams participant data to CSV shards.
+
+    The shards have the columns of stroopdata.csv and can be
+    summarised with `sharded.summarize_shards`.
+
+    Parameters
+    ----------
+    directory : string
+        Existing output directory.
+    n : int
+        Total number of participants.
+    rows_per_shard : int
+        Participants per file.
+    seed : None/int
+        Seed for reproducible data.
+    prefix : string
+        File names are prefix_00000.csv and so on.
+    **kwargs
+        Passed to `participants`.
+
+    Returns
+    -------
+    paths : list
+    """
+
+    paths = []
+    for i, (start, size, chunk_seed) in enumerate(
+            _chunks(n, rows_per_shard, seed)):
+        path = os.path.join(directory, '{0}_{1:05d}.csv'.format(prefix, i))
+        data = participants(size, seed=chunk_seed, **kwargs)
+        data.to_csv(path, index=False, float_format='%.3f')
+        paths.append(path)
+    return paths
+
+
+def write_trials(path, n, n_trials=24, chunk_participants=10 ** 5,
+                 seed=None, **kwargs):
+    """Streams trial level data to a memory mapped .npy file.
+
+    Parameters
+    ----------
+    path : string
+        Output .npy file of `TRIAL_DTYPE` records.
+    n : int
+        Number of participants, the file holds n * 2 * n_trials
+        records.
+    n_trials : int
+        Words per condition.
+    chunk_participants : int
+        Participants generated per chunk.
+    seed : None/int
+        Seed for reproducible data.
+    **kwargs
+        Passed to `trials`.
+
+    Returns
+    -------
+    path : string
+    """
+
+    rows = 2 * n_trials
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=TRIAL_DTYPE,
+                                    shape=(n * rows,))
+    for start, size, chunk_seed in _chunks(n, chunk_participants, seed):
+        records = trials(size, n_trials, seed=chunk_seed, **kwargs)
+        records['participant'] += start
+        out[start * rows:(start + size) * rows] = records
+    out.flush()
+    del out
+    return path
@@ -8,11 +8,27 @@
 """
 import matplotlib.pyplot as plt
 from matplotlib import gridspec
-import pandas as pd
 import seaborn as sns
 
+from descriptive import describe, section
 
-def table_central_tend(data, axs, f=2):
+
+def _cell_text(sec, f):
+    """Returns table rows of a tex label then rounded values.
+
+    Parameters
+    ----------
+    sec : descriptive.Section
+        Section of computed statistics.
+    f : int
+        Interger to set the rounding position.
+    """
+
+    return [[stat.tex] + [round(v, f) for v in stat.values.tolist()]
+            for stat in sec.statistics]
+
+
+def table_central_tend(data, axs, f=2, dtype='float64', summary=None):
     """Returns a plotted table on an axs.
 
     Based on statistics for central tendancy, can
@@ -31,28 +47,26 @@ def table_central_tend(data, axs, f=2):
     f : int
         Interger to set the rounding position to be presented in
         the table.
+    dtype : string
+        'float64', or 'float32' to compute in reduced precision,
+        see `precision`.
+    summary : None/descriptive.Summary
+        Statistics already computed from `data`, None computes
+        them.
 
     See Also
     --------
     descriptive_table : function which plots a group of tables together
     """
 
-    # Central tendacy
-    v_mean = round(data.mean(), f)
-    v_median = round(data.median(), f)
-
-    # Use built in tex only, no depandancy needed
-    sample_mean_str = "mean, " + r' $\bar x$ '
-    sample_median_str = "median"
-
-    # Concatenate the statistics and symbols
-    symbols = pd.DataFrame([sample_mean_str, sample_median_str])
-    val = pd.DataFrame([v_mean, v_median])
-    data = pd.concat([symbols, val], axis=1)
+    # Central tendacy, labels use built in tex only
+    if summary is None:
+        summary = describe(data, dtype=dtype)
+    cells = _cell_text(section(summary, 'Central Tendency'), f)
 
     # Plot onto matplotlib axs
     central_tend = axs.table(
-                             cellText=data.values,
+                             cellText=cells,
                              loc='center',
                              cellLoc="center",
                              colLoc='center',
@@ -71,7 +85,7 @@ def table_central_tend(data, axs, f=2):
     table_settings(axs, central_tend)
 
 
-def table_disperssion(data, axs, f=2):
+def table_disperssion(data, axs, f=2, dtype='float64', summary=None):
     """Returns a plotted table on an axs.
 
     Based on statistics for disperssion, can
@@ -90,39 +104,25 @@ def table_disperssion(data, axs, f=2):
     f : int
         Interger to set the rounding position to be presented in
         the table.
+    dtype : string
+        'float64', or 'float32' to compute in reduced precision,
+        see `precision`.
+    summary : None/descriptive.Summary
+        Statistics already computed from `data`, None computes
+        them.
 
     See Also
     --------
     descriptive_table : function which plots a group of tables together
     """
 
-    # Measures of disperssion
-    v_bessel_sd = round(data.std(), f)
-    v_var = round(data.var(), f)
-    v_range = round((data.max()-data.min()), f)
-    v_iqr = round((data.quantile(0.75)-data.quantile(0.25)), f)
-    v_mad = round(data.mad(), f)
-
-    # Use built in tex only, no depandancy needed
-    sample_std_str = "stan. dev." + r' $s$ '
-    sample_var_str = "variance, " + '$s^2$'
-    sample_range_str = "range"
-    sample_iqr_str = "$IQR$"
-    sample_mad_str = "mean abs. dev."
-
-    symbols = pd.DataFrame(
-                        [sample_std_str, sample_iqr_str,
-                         sample_mad_str, sample_var_str,
-                         sample_range_str]
-                        )
-    val = pd.DataFrame(
-                    [v_bessel_sd,  v_iqr,
-                     v_mad, v_var, v_range]
-                     )
-    data = pd.concat([symbols, val], axis=1)
+    # Measures of disperssion, labels use built in tex only
+    if summary is None:
+        summary = describe(data, dtype=dtype)
+    cells = _cell_text(section(summary, 'Dispersion'), f)
 
     disperssion = axs.table(
-                            cellText=data.values,
+                            cellText=cells,
                             loc='center',
                             cellLoc="center",
                             colLoc='right',
@@ -139,7 +139,7 @@ def table_disperssion(data, axs, f=2):
     table_settings(axs, disperssion)
 
 
-def table_distribution(data, axs, f=2):
+def table_distribution(data, axs, f=2, dtype='float64', summary=None):
     """Returns a plotted table on an axs.
 
     Based on statistics for distribution, can
@@ -158,52 +158,25 @@ def table_distribution(data, axs, f=2):
     f : int
         Interger to set the rounding position to be presented in
         the table.
+    dtype : string
+        'float64', or 'float32' to compute in reduced precision,
+        see `precision`.
+    summary : None/descriptive.Summary
+        Statistics already computed from `data`, None computes
+        them.
 
     See Also
     --------
     descriptive_table : function which plots a group of tables together
     """
 
-    # Measures of distribution
-    v_max = round(data.max(), f)
-    v_95 = round((data.quantile(0.95)), f)
-    v_90 = round((data.quantile(0.9)), f)
-    v_75 = round((data.quantile(0.75)), f)
-    v_50 = round((data.quantile(0.5)), f)
-    v_25 = round((data.quantile(0.25)), f)
-    v_10 = round((data.quantile(0.1)), f)
-    v_05 = round((data.quantile(0.05)), f)
-    v_min = round(data.min(), f)
-
-    # pandas quantile returns a series which needs to be recombined
-    # hence reset_index and transpose used in this case.
-    quantiles = pd.concat(
-                          [v_max, v_95, v_90,
-                           v_75, v_50, v_25,
-                           v_10, v_05, v_min],
-                          axis=1
-                          ).transpose().reset_index()
-    quantiles.drop('index', axis=1, inplace=True)
-
-    # Use built in tex only, no depandancy needed
-    sample_max_str = r"maximum"
-    sample_95_str = r"$Q(0.95)$"
-    sample_90_str = r"$Q(0.90)$"
-    sample_75_str = r"$Q(0.75)$"
-    sample_50_str = r"$Q(0.50)$"
-    sample_25_str = r"$Q(0.25)$"
-    sample_10_str = r"$Q(0.10)$"
-    sample_05_str = r"$Q(0.05)$"
-    sample_min_str = r"minimum"
-
-    symbols = pd.DataFrame([sample_max_str, sample_95_str, sample_90_str,
-                            sample_75_str, sample_50_str, sample_25_str,
-                            sample_10_str, sample_05_str, sample_min_str])
-
-    data = pd.concat([symbols, quantiles], axis=1)
+    # Measures of distribution, labels use built in tex only
+    if summary is None:
+        summary = describe(data, dtype=dtype)
+    cells = _cell_text(section(summary, 'Distribution'), f)
 
     distribution = axs.table(
-                             cellText=data.values,
+                             cellText=cells,
                              loc='center',
                              cellLoc="center",
                              colLoc='right',
@@ -220,7 +193,7 @@ def table_distribution(data, axs, f=2):
     table_settings(axs, distribution)
 
 
-def table_top(data, name, axs):
+def table_top(data, name, axs, summary=None):
     """Returns a plotted table on an axs.
 
     Simpy creates a small table with the count of samples
@@ -243,24 +216,19 @@ def table_top(data, name, axs):
     axs : matplotlib axs object
         axs (e.g. subplot object) from matplotlib in which
         the plot shall be created.
+    summary : None/descriptive.Summary
+        Statistics already computed from `data`, None computes
+        them.
 
     See Also
     --------
     descriptive_table : function which plots a group of tables together
     """
 
-    # Count
-    v_count = []
-    for i in name:
-        v_col_size = data[i].size
-        v_count.append(v_col_size)
-
-    # Use built in tex only, no depandancy needed
-    sample_count_str = "samples, " + r' $n$ '
-
-    symbols = pd.DataFrame([sample_count_str])
-    val = pd.DataFrame([v_count])
-    data = pd.concat([symbols, val], axis=1)
+    # Count, label uses built in tex only
+    if summary is None:
+        summary = describe(data[list(name)], name)
+    cells = _cell_text(section(summary, 'Top'), 0)
 
     # Get column names out of list
     labels = [""]
@@ -268,7 +236,7 @@ def table_top(data, name, axs):
         labels.append(i)
 
     top = axs.table(
-                    cellText=data.values,
+                    cellText=cells,
                     colLabels=labels,
                     loc='center',
                     cellLoc="center",
@@ -304,12 +272,11 @@ def table_settings(axs_num, table_name):
     descriptive_table : function which plots a group of tables together
     """
 
-    table_props = table_name.properties()
-    table_cells = table_props['child_artists']  # matplotlib setting
+    table_cells = table_name.get_celld().values()
     # iterate through cells of a table to change properties
     for cell in table_cells:
-            cell._text.set_fontsize(15)
-            cell._text.set_color('#192231')  # Light grey
+            cell.get_text().set_fontsize(15)
+            cell.get_text().set_color('#192231')  # Light grey
 
     # Set axis tick labels off, i.e. empty [].
     axs_num.set_yticklabels([])
@@ -323,7 +290,8 @@ def table_settings(axs_num, table_name):
                     rc={'font.sans-serif': 'Gill Sans MT'}
                     )
 
-    sns.despine(offset=2, top=False, trim=False, left=True, bottom=True)
+    sns.despine(ax=axs_num, offset=2, top=False, trim=False,
+                left=True, bottom=True)
 
     # Leave one line on top to break up the table
     axs_num.spines['top'].set_color('#9099A2')
@@ -336,7 +304,8 @@ def table_settings(axs_num, table_name):
             )
 
 
-def descriptive_table(data, column_name, fig_size=(8, 8)):
+def descriptive_table(data, column_name, fig_size=(8, 8), fig=None,
+                      dtype='float64'):
     """Creates a plotted table of descriptive statistics.
 
     Parameters
@@ -350,6 +319,17 @@ def descriptive_table(data, column_name, fig_size=(8, 8)):
     fig_size : tuple
         Two ints/floats to set the figure size. First value is
         width, second value is height.
+    fig : None/matplotlib Figure
+        Empty figure to draw the tables on, for example one
+        taken from a `lifecycle.FigurePool`. None creates a
+        new figure of `fig_size`.
+    dtype : string
+        'float64', or 'float32' to compute in reduced precision,
+        see `precision`.
+
+    Returns
+    -------
+    sheet : matplotlib Figure
 
     See Also
     --------
@@ -357,31 +337,38 @@ def descriptive_table(data, column_name, fig_size=(8, 8)):
     """
 
     # Set up figure dimensions and sub components.
-    sheet, axs = plt.subplots(4, 1, figsize=fig_size)
+    if fig is None:
+        sheet = plt.figure(figsize=fig_size)
+    else:
+        sheet = fig
 
     # Heights ratio is based on the number of rows in each
     # table, this relates to the number of statistics each
     # sub table will show.
-    gs = gridspec.GridSpec(4, 1, height_ratios=[2, 2, 5, 9])
+    gs = gridspec.GridSpec(4, 1, height_ratios=[2, 2, 5, 9], figure=sheet)
 
     # Assign all subplots based on figure dimensions.
-    ax0 = plt.subplot(gs[0])
-    ax1 = plt.subplot(gs[1])
-    ax2 = plt.subplot(gs[2])
-    ax3 = plt.subplot(gs[3])
+    ax0 = sheet.add_subplot(gs[0])
+    ax1 = sheet.add_subplot(gs[1])
+    ax2 = sheet.add_subplot(gs[2])
+    ax3 = sheet.add_subplot(gs[3])
 
     title_color = '#9099A2'  # Dark grey
-    plt.suptitle(
-                 'Descriptive Statistics',
-                 fontsize=16,
-                 color=title_color,
-                 x=0.25
-                 )
-
-    table_top(data, column_name, ax0)
-    table_central_tend(data, ax1)
-    table_disperssion(data, ax2)
-    table_distribution(data, ax3)
+    sheet.suptitle(
+                   'Descriptive Statistics',
+                   fontsize=16,
+                   color=title_color,
+                   x=0.25
+                   )
+
+    # Every statistic is computed once and shared by the tables.
+    summary = describe(data, column_name, dtype=dtype)
+    table_top(data, column_name, ax0, summary=summary)
+    table_central_tend(data, ax1, summary=summary)
+    table_disperssion(data, ax2, summary=summary)
+    table_distribution(data, ax3, summary=summary)
 
     # Adjust the spacing so the title fits correctly.
     sheet.subplots_adjust(hspace=0.2, top=0.95)
+
+    return sheet
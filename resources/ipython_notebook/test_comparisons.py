@@ -0,0 +1,56 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    test_comparisons
+    ~~~~~~~~~~~~~~~~
+
+    Tests of the pairwise comparison matrices, run with
+    ``python -m pytest`` from this directory.
+"""
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+
+from comparisons import (SIGNED, SWAPPED_BOUNDS, comparison_matrix,
+                         pairwise_tests)
+
+
+def _results():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(size=(40, 4)) + [0.0, 0.3, 0.6, 1.2],
+                        columns=['w', 'x', 'y', 'z'])
+    return pairwise_tests(data)
+
+
+def test_signed_values_are_antisymmetric():
+    results = _results()
+    for value in SIGNED:
+        matrix = comparison_matrix(results, value).to_numpy()
+        np.testing.assert_allclose(matrix, -matrix.T, err_msg=value)
+
+
+def test_bounds_mirror_as_negated_opposite_bound():
+    results = _results()
+    for value, other in SWAPPED_BOUNDS.items():
+        matrix = comparison_matrix(results, value).to_numpy()
+        opposite = comparison_matrix(results, other).to_numpy()
+        np.testing.assert_allclose(matrix, -opposite.T, err_msg=value)
+
+        # The (b, a) interval contains the (b, a) estimate.
+        estimate = value.replace('_lower', '').replace('_upper', '')
+        if estimate == 'ci':
+            estimate = 'mean_difference'
+        centre = comparison_matrix(results, estimate).to_numpy()
+        off_diagonal = ~np.eye(len(matrix), dtype=bool)
+        if value.endswith('_lower'):
+            assert (matrix <= centre)[off_diagonal].all(), value
+        else:
+            assert (matrix >= centre)[off_diagonal].all(), value
+
+
+def test_unsigned_values_are_symmetric():
+    results = _results()
+    for value in ('p', 'p_adjusted', 'n', 'sd_difference'):
+        matrix = comparison_matrix(results, value).to_numpy()
+        np.testing.assert_allclose(matrix, matrix.T, err_msg=value)
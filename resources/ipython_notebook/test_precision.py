@@ -0,0 +1,69 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    test_precision
+    ~~~~~~~~~~~~~~
+
+    Tests of the float32 compute mode against float64, run with
+    ``python -m pytest`` from this directory.
+"""
+from __future__ import print_function
+import math
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from figures import batched_histograms
+from precision import check_float32, pairwise_sum
+from synthetic import participants
+
+PAIRS = [('Incongruent', 'Congruent')]
+
+
+def test_check_float32_within_tolerances():
+    for n, seed in ((24, 0), (10 ** 5, 1), (10 ** 6, 2)):
+        data = participants(n, seed=seed)
+        report = check_float32(data, PAIRS)
+        assert report.within.all(), report[~report.within]
+
+
+def test_check_float32_with_missing_values():
+    data = participants(10 ** 5, seed=3)
+    rng = np.random.default_rng(3)
+    data = data.mask(rng.random(data.shape) < 0.05)
+    report = check_float32(data, PAIRS)
+    assert report.within.all(), report[~report.within]
+
+
+def test_pairwise_sum_matches_fsum():
+    x = participants(10 ** 6, seed=4).to_numpy(dtype=np.float32)
+    total = pairwise_sum(x)
+    for j in range(x.shape[1]):
+        exact = math.fsum(x[:, j].astype(float))
+        assert abs(float(total[j]) - exact) <= 1e-6 * abs(exact)
+
+    # A row major axis 0 sum drifts further from the exact total.
+    naive = x.sum(axis=0, dtype=np.float32)
+    exact = np.array([math.fsum(x[:, j].astype(float))
+                      for j in range(x.shape[1])])
+    assert np.all(np.abs(total - exact) <= np.abs(naive - exact))
+
+
+def test_pairwise_sum_float64_and_empty():
+    x = np.arange(12.0).reshape(4, 3)
+    np.testing.assert_array_equal(pairwise_sum(x), x.sum(axis=0))
+    empty = np.zeros((0, 3), dtype=np.float32)
+    np.testing.assert_array_equal(pairwise_sum(empty), np.zeros(3))
+
+
+def test_batched_histograms_float32_counts():
+    data = participants(10 ** 5, seed=5)
+    counts, edges = batched_histograms(data, bins=30)
+    counts_32, edges_32 = batched_histograms(data, bins=30,
+                                             dtype='float32')
+
+    np.testing.assert_allclose(edges_32, edges, rtol=1e-6)
+    # Only values within float32 rounding of an edge may move.
+    assert (counts_32.sum(axis=1) == counts.sum(axis=1)).all()
+    assert np.abs(counts_32 - counts).sum() <= 1e-4 * counts.sum()
@@ -0,0 +1,233 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    theoretical
+    ~~~~~~~~~~~
+
+    This module memoizes the theoretical quantiles of Q-Q plots.
+
+    In batch reports most columns share n and the distribution, so
+    the plotting positions and the `ppf` values (slow for anything
+    but the normal) are computed once and kept in a bounded least
+    recently used cache. `figures.qq_plot` and `rendering.qq_figure`
+    both draw from `DEFAULT_CACHE`.
+
+    Example::
+
+        x, y = probplot(df['Congruent'], 'norm')
+        DEFAULT_CACHE.hits, DEFAULT_CACHE.misses
+"""
+from __future__ import print_function
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+from scipy import stats
+
+# Plotting position offsets a of (i - a) / (n + 1 - 2a).
+POSITION_OFFSETS = {'weibull': 0.0, 'blom': 0.375, 'hazen': 0.5}
+
+
+def plotting_positions(n, rule='filliben'):
+    """Returns the probabilities at which sorted data is plotted.
+
+    Parameters
+    ----------
+    n : int
+        Number of values.
+    rule : string
+        'filliben' gives Filliben's estimate of the uniform order
+        statistic medians, as used by scipy.stats.probplot.
+        'weibull', 'blom' or 'hazen' give (i - a) / (n + 1 - 2a).
+
+    Returns
+    -------
+    p : ndarray
+    """
+
+    if rule == 'filliben':
+        p = np.empty(n)
+        if n == 0:
+            return p
+        p[-1] = 0.5 ** (1.0 / n)
+        p[0] = 1 - p[-1]
+        i = np.arange(2, n)
+        p[1:-1] = (i - 0.3175) / (n + 0.365)
+        return p
+
+    if rule not in POSITION_OFFSETS:
+        raise ValueError(
+                         "rule must be 'filliben', 'weibull', 'blom' or "
+                         "'hazen', not {0!r}".format(rule)
+                         )
+    a = POSITION_OFFSETS[rule]
+    return (np.arange(1, n + 1) - a) / (n + 1 - 2 * a)
+
+
+def distribution_name(distribution):
+    """Returns the name of a distribution for axis labels.
+
+    Frozen scipy distributions keep their name on `dist`, names
+    and other objects are returned as given.
+    """
+
+    return getattr(getattr(distribution, 'dist', distribution), 'name',
+                   distribution)
+
+
+def _distribution(distribution):
+    """Returns (distribution object, key) for a name or object.
+
+    Frozen distributions are keyed by name, shape parameters,
+    location and scale.
+    """
+
+    if isinstance(distribution, str):
+        return getattr(stats, distribution), (distribution,)
+
+    dist = getattr(distribution, 'dist', None)
+    if dist is not None:
+        kwds = tuple(sorted(distribution.kwds.items()))
+        return distribution, (dist.name, distribution.args, kwds)
+
+    return distribution, (distribution_name(distribution),)
+
+
+class QuantileCache(object):
+    """A bounded least recently used cache of theoretical quantiles.
+
+    Cached arrays are read only, as they are shared by every
+    caller. Safe to use from several threads.
+
+    Parameters
+    ----------
+    max_size : int
+        Largest number of quantile vectors kept.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups answered from the cache.
+    misses : int
+        Number of lookups that computed the quantiles.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """Number of quantile vectors held."""
+        return len(self._entries)
+
+    def quantiles(self, distribution, n, rule='filliben', sparams=()):
+        """Returns the theoretical quantiles for n sorted values.
+
+        Parameters
+        ----------
+        distribution : string/scipy distribution
+            Name in scipy.stats, a distribution or a frozen
+            distribution such as one fitted by `exgauss`.
+        n : int
+            Number of values.
+        rule : string
+            Plotting position rule, see `plotting_positions`.
+        sparams : tuple
+            Shape, location and scale passed to `ppf`, as in
+            scipy.stats.probplot.
+
+        Returns
+        -------
+        q : ndarray
+            Read only, increasing.
+        """
+
+        dist, dist_key = _distribution(distribution)
+        sparams = tuple(np.atleast_1d(sparams).tolist())
+        key = (dist_key, sparams, int(n), rule)
+        try:
+            hash(key)
+        except TypeError:
+            # Array valued parameters are computed every time.
+            key = None
+
+        if key is not None:
+            with self._lock:
+                q = self._entries.get(key)
+                if q is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return q
+
+        q = dist.ppf(plotting_positions(int(n), rule), *sparams)
+        q.setflags(write=False)
+
+        with self._lock:
+            self.misses += 1
+            if key is not None:
+                self._entries[key] = q
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return q
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by the plotting functions.
+DEFAULT_CACHE = QuantileCache()
+
+
+def theoretical_quantiles(distribution, n, rule='filliben', sparams=(),
+                          cache=None):
+    """Returns cached theoretical quantiles, see
+    `QuantileCache.quantiles`.
+
+    Parameters
+    ----------
+    cache : None/QuantileCache
+        None uses `DEFAULT_CACHE`.
+    """
+
+    if cache is None:
+        cache = DEFAULT_CACHE
+    return cache.quantiles(distribution, n, rule, sparams)
+
+
+def probplot(data, distribution='norm', rule='filliben', sparams=(),
+             cache=None):
+    """Returns the points of a Q-Q plot, like scipy.stats.probplot
+    with fit=False but with cached theoretical quantiles.
+
+    Parameters
+    ----------
+    data : array_like
+        Values, missing values are dropped.
+    distribution : string/scipy distribution
+    rule : string
+        Plotting position rule, see `plotting_positions`.
+    sparams : tuple
+        Passed to `ppf`.
+    cache : None/QuantileCache
+        None uses `DEFAULT_CACHE`.
+
+    Returns
+    -------
+    x : ndarray
+        Theoretical quantiles, read only.
+    y : ndarray
+        Sorted data.
+    """
+
+    y = np.asarray(data, dtype=float).ravel()
+    y = np.sort(y[~np.isnan(y)])
+    x = theoretical_quantiles(distribution, y.size, rule, sparams, cache)
+    return x, y